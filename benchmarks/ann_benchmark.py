@@ -0,0 +1,92 @@
+"""
+Recall vs latency of the approximate PO index types against the exact flat
+baseline.
+
+    python -m benchmarks.ann_benchmark --num-pos 1000000 --queries 1000
+
+Vectors are synthetic: a low-dimensional latent space projected up to the
+embedding model's dimension, which mimics the low intrinsic dimensionality
+of sentence embeddings without loading the model.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from src.core.vector_index import bytes_per_vector, build_index
+
+CONFIGURATIONS = [
+    ("flat", "none"),
+    ("flat", "float16"),
+    ("flat", "int8"),
+    ("hnsw", "none"),
+    ("hnsw", "float16"),
+    ("hnsw", "int8"),
+    ("ivfpq", "none"),
+]
+
+
+def synthetic_vectors(
+    n: int, dim: int, latent_dim: int, seed: int, projection_seed: int = 0
+) -> np.ndarray:
+    projection = np.random.default_rng(projection_seed).normal(size=(latent_dim, dim))
+    rng = np.random.default_rng(seed)
+    vectors = rng.normal(size=(n, latent_dim)) @ projection
+    vectors += 0.05 * rng.normal(size=(n, dim))
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors.astype(np.float32)
+
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth))
+    return hits / truth.size
+
+
+def run(args):
+    print(f"Generating {args.num_pos:,} PO vectors (dim={args.dim})...")
+    corpus = synthetic_vectors(args.num_pos, args.dim, args.latent_dim, seed=1)
+    queries = synthetic_vectors(args.queries, args.dim, args.latent_dim, seed=2)
+
+    truth = None
+    print(
+        f"\n{'index':<8} {'compress':<8} {'build s':>8} {'bytes/PO':>9} "
+        f"{'recall@' + str(args.k):>9} {'batch us/q':>11} {'single us/q':>12}"
+    )
+    for index_type, compression in CONFIGURATIONS:
+        start = time.perf_counter()
+        index = build_index(corpus, index_type, compression)
+        build_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        _, found = index.search(queries, args.k)
+        batch_us = (time.perf_counter() - start) / len(queries) * 1e6
+
+        start = time.perf_counter()
+        for query in queries[: args.single_queries]:
+            index.search(query[None, :], args.k)
+        single_us = (time.perf_counter() - start) / args.single_queries * 1e6
+
+        if truth is None:
+            # The first configuration is the exact flat index.
+            truth = found
+
+        print(
+            f"{index_type:<8} {compression:<8} {build_seconds:>8.1f} "
+            f"{bytes_per_vector(index):>9.0f} {recall_at_k(found, truth):>9.3f} "
+            f"{batch_us:>11.1f} {single_us:>12.1f}"
+        )
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--num-pos", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=1_000)
+    parser.add_argument("--single-queries", type=int, default=200)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--latent-dim", type=int, default=24)
+    parser.add_argument("-k", type=int, default=3)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    run(parse_args())
@@ -0,0 +1,86 @@
+"""
+Startup budget for the CLI: importing main and running `main.py status`
+must stay fast and must not load the ML stack.
+
+    python -m benchmarks.import_budget --budget-ms 500
+
+Each check runs in a fresh interpreter so nothing is already cached in
+sys.modules. Exits non-zero when a heavy module is imported or the median
+of `--repeat` runs exceeds the budget, so it can gate CI.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List
+
+# Imported only once there is real work: graph, LLM client, embeddings, index.
+HEAVY_MODULES = [
+    "langgraph",
+    "langchain_google_genai",
+    "google.genai",
+    "langchain_huggingface",
+    "langchain_community",
+    "sentence_transformers",
+    "torch",
+    "faiss",
+    "scipy",
+]
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import contextlib, io, json, sys, time
+start = time.perf_counter()
+{body}
+elapsed = time.perf_counter() - start
+heavy = [m for m in {heavy!r} if m in sys.modules]
+print(json.dumps({{"ms": elapsed * 1000, "heavy": heavy}}))
+"""
+
+CHECKS = {
+    "import main": "import main",
+    "main.py status": (
+        "import main\n"
+        "with contextlib.redirect_stdout(io.StringIO()):\n"
+        "    main.show_status()"
+    ),
+}
+
+
+def probe(body: str) -> Dict:
+    script = PROBE.format(body=body, heavy=HEAVY_MODULES)
+    result = subprocess.run(
+        [sys.executable, "-c", script], capture_output=True, text=True, check=True, cwd=ROOT
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def run(budget_ms: float, repeat: int) -> List[str]:
+    failures = []
+    for name, body in CHECKS.items():
+        samples = [probe(body) for _ in range(repeat)]
+        median = statistics.median(s["ms"] for s in samples)
+        heavy = sorted({m for s in samples for m in s["heavy"]})
+        ok = median <= budget_ms and not heavy
+        print(
+            f"{'✅' if ok else '❌'} {name}: {median:.0f} ms median "
+            f"(budget {budget_ms:.0f} ms)" + (f", loaded {', '.join(heavy)}" if heavy else "")
+        )
+        if median > budget_ms:
+            failures.append(f"{name} took {median:.0f} ms")
+        if heavy:
+            failures.append(f"{name} imported {', '.join(heavy)}")
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--budget-ms", type=float, default=500.0)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    failures = run(args.budget_ms, max(args.repeat, 1))
+    sys.exit(1 if failures else 0)
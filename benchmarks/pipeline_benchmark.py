@@ -0,0 +1,256 @@
+"""
+Throughput, latency and memory of the reconciliation agents on a synthetic
+PO catalog.
+
+    python -m benchmarks.pipeline_benchmark --num-pos 100000 --invoices 2000
+
+Extraction is stubbed: every invoice is a pre-built payload from
+benchmarks.synthetic, so the run measures verification, matching,
+discrepancy detection and resolution. Embeddings default to a hashing
+vectorizer so no model is downloaded; pass --embeddings model to use the
+configured sentence-transformer. Indexing 1M POs with either takes a few
+minutes and is reported separately from the per-invoice numbers.
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+import zlib
+from collections import Counter
+from typing import Dict, List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from benchmarks.synthetic import NoiseProfile, generate_invoices, iter_purchase_orders, write_catalog
+from src.agents.discrepancy import DiscrepancyDetectorAgent
+from src.agents.matching import MatchingAgent
+from src.agents.resolution import ResolutionAgent
+from src.agents.verifier import ExtractionVerifier
+from src.core.database import PurchaseOrderDatabase
+from src.core.metrics import MetricsRegistry, peak_rss_bytes
+from src.core.state import AgentState, ExtractedLineItem
+
+STAGES = ["extract", "verify", "match", "discrepancy", "resolve"]
+
+
+class HashingEmbeddings(Embeddings):
+    """Bag of hashed character trigrams: cheap, deterministic, similarity-preserving."""
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        text = f"  {text.lower()} "
+        for i in range(len(text) - 2):
+            vector[zlib.crc32(text[i : i + 3].encode()) % self.dim] += 1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+class StubExtractor:
+    """Stands in for the Document Intelligence Agent, serving synthetic payloads."""
+
+    def __init__(self, payloads: Dict[str, Dict]):
+        self.payloads = payloads
+
+    def process(self, state: AgentState) -> AgentState:
+        data = self.payloads[state.file_path]
+        state.extracted_invoice_id = data["invoice_id"]
+        state.extracted_supplier = data["supplier_name"]
+        state.extracted_date = data["date"]
+        state.extracted_currency = data["currency"]
+        state.extracted_po_ref = data["po_reference"]
+        state.extracted_items = [ExtractedLineItem(**item) for item in data["items"]]
+        state.extraction_confidence = data["overall_confidence"]
+        state.extraction_method = "stub"
+        return state
+
+
+def timed(metrics: MetricsRegistry, stage: str, fn, *args):
+    wall, cpu = time.perf_counter(), time.thread_time()
+    result = fn(*args)
+    metrics.observe(
+        stage,
+        {
+            "wall_ms": (time.perf_counter() - wall) * 1000,
+            "cpu_ms": (time.thread_time() - cpu) * 1000,
+        },
+    )
+    return result
+
+
+def build_database(args, workdir: str) -> PurchaseOrderDatabase:
+    catalog_path = os.path.join(workdir, "purchase_orders.json")
+    start = time.perf_counter()
+    count = write_catalog(
+        catalog_path,
+        iter_purchase_orders(
+            args.num_pos,
+            n_suppliers=args.suppliers,
+            supplier_skew=args.supplier_skew,
+            mean_lines=args.mean_lines,
+            max_lines=args.max_lines,
+            seed=args.seed,
+        ),
+    )
+    print(f"Generated {count:,} POs in {time.perf_counter() - start:.1f}s")
+
+    if args.embeddings == "model":
+        from src.core.registry import ResourceRegistry
+
+        embeddings = ResourceRegistry().get_embeddings()
+    else:
+        embeddings = HashingEmbeddings()
+
+    start = time.perf_counter()
+    db = PurchaseOrderDatabase(
+        catalog_path,
+        vector_db_path=os.path.join(workdir, "db_faiss"),
+        embeddings=embeddings,
+        index_type=args.index_type,
+        compression=args.compression,
+    )
+    print(
+        f"Loaded catalog and built {args.index_type} index in "
+        f"{time.perf_counter() - start:.1f}s (peak RSS {peak_rss_bytes() / 2**20:.0f} MB)"
+    )
+    return db
+
+
+def run(args):
+    workdir = tempfile.mkdtemp(prefix="safepay-bench-")
+    try:
+        db = build_database(args, workdir)
+        noise = NoiseProfile(
+            missing_po_ref=args.missing_po_ref,
+            price_trap=args.price_trap,
+            reordered_lines=args.reordered_lines,
+            supplier_variant=args.supplier_variant,
+            math_error=args.math_error,
+        )
+        invoices = generate_invoices(list(db.data.values()), args.invoices, noise, args.seed + 1)
+        payloads = {f"synthetic/{i:07d}.pdf": payload for i, (payload, _) in enumerate(invoices)}
+
+        extractor = StubExtractor(payloads)
+        verifier = ExtractionVerifier()
+        matcher = MatchingAgent(db=db)
+        detector = DiscrepancyDetectorAgent(db=db)
+        resolver = ResolutionAgent()
+        metrics = MetricsRegistry()
+
+        rss_before = peak_rss_bytes()
+        start = time.perf_counter()
+        states = []
+        for file_path in payloads:
+            state = AgentState(file_path=file_path)
+            wall = time.perf_counter()
+            timed(metrics, "extract", extractor.process, state)
+            timed(metrics, "verify", verifier.verify, state)
+            timed(metrics, "match", matcher.match, state)
+            timed(metrics, "discrepancy", detector.check, state)
+            timed(metrics, "resolve", resolver.resolve, state)
+            metrics.observe(
+                "invoice", {"wall_ms": (time.perf_counter() - wall) * 1000, "cpu_ms": 0.0}
+            )
+            states.append(state)
+        elapsed = time.perf_counter() - start
+
+        report = summarize(args, states, [e for _, e in invoices], metrics, elapsed)
+        report["peak_rss_mb"] = peak_rss_bytes() / 2**20
+        report["peak_rss_growth_mb"] = (peak_rss_bytes() - rss_before) / 2**20
+        print_report(report)
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(report, f, indent=2)
+            print(f"\nWrote {args.output}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def summarize(args, states, expected, metrics: MetricsRegistry, elapsed: float) -> Dict:
+    percentiles = metrics.percentiles()
+    trapped = [(s, e) for s, e in zip(states, expected) if "price_trap" in e["noise"]]
+    unreferenced = [(s, e) for s, e in zip(states, expected) if "missing_po_ref" in e["noise"]]
+    return {
+        "config": vars(args),
+        "invoices": len(states),
+        "seconds": elapsed,
+        "invoices_per_second": len(states) / elapsed if elapsed else 0.0,
+        "latency_ms": {
+            stage: {key: value * 1000 for key, value in stats.items() if key != "count"}
+            for stage, stats in percentiles.items()
+        },
+        "match_accuracy": float(
+            np.mean([s.matched_po_id == e["po_number"] for s, e in zip(states, expected)])
+        ),
+        "match_accuracy_without_ref": float(
+            np.mean([s.matched_po_id == e["po_number"] for s, e in unreferenced])
+        )
+        if unreferenced
+        else None,
+        "price_trap_recall": float(
+            np.mean(
+                [any(d.type == "price_mismatch" for d in s.discrepancies) for s, _ in trapped]
+            )
+        )
+        if trapped
+        else None,
+        "actions": dict(Counter(s.final_action for s in states)),
+    }
+
+
+def print_report(report: Dict):
+    print(
+        f"\n{report['invoices']:,} invoices in {report['seconds']:.2f}s "
+        f"({report['invoices_per_second']:.1f} invoices/s), "
+        f"peak RSS {report['peak_rss_mb']:.0f} MB (+{report['peak_rss_growth_mb']:.0f} MB)"
+    )
+    print(f"\n{'stage':<12} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for stage in STAGES + ["invoice"]:
+        stats = report["latency_ms"].get(stage)
+        if stats:
+            print(f"{stage:<12} {stats['p50']:>9.3f} {stats['p95']:>9.3f} {stats['p99']:>9.3f}")
+
+    print(f"\nmatch accuracy:             {report['match_accuracy']:.3f}")
+    if report["match_accuracy_without_ref"] is not None:
+        print(f"match accuracy (no PO ref): {report['match_accuracy_without_ref']:.3f}")
+    if report["price_trap_recall"] is not None:
+        print(f"price trap recall:          {report['price_trap_recall']:.3f}")
+    print(f"actions: {report['actions']}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--num-pos", type=int, default=10_000)
+    parser.add_argument("--invoices", type=int, default=1_000)
+    parser.add_argument("--suppliers", type=int, default=500)
+    parser.add_argument(
+        "--supplier-skew", type=float, default=1.0, help="0 = uniform, 1 = Zipf"
+    )
+    parser.add_argument("--mean-lines", type=float, default=4.0)
+    parser.add_argument("--max-lines", type=int, default=20)
+    parser.add_argument("--missing-po-ref", type=float, default=0.15)
+    parser.add_argument("--price-trap", type=float, default=0.10)
+    parser.add_argument("--reordered-lines", type=float, default=0.30)
+    parser.add_argument("--supplier-variant", type=float, default=0.20)
+    parser.add_argument("--math-error", type=float, default=0.02)
+    parser.add_argument("--index-type", default="flat", choices=["flat", "hnsw", "ivfpq"])
+    parser.add_argument("--compression", default="none", choices=["none", "float16", "int8"])
+    parser.add_argument("--embeddings", default="hashing", choices=["hashing", "model"])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the report as JSON to this path.")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    run(parse_args())
@@ -0,0 +1,198 @@
+"""
+Synthetic PO catalogs and invoice payloads for benchmarking.
+
+Catalogs follow the shape of data/purchase_orders.json. Invoices are
+extraction payloads (what the Document Intelligence Agent would produce)
+derived from catalog POs, with controlled noise and the expected outcome
+recorded next to each one.
+"""
+import itertools
+import json
+import random
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Tuple
+
+SUPPLIER_WORDS = [
+    "Pharma", "Bio", "Chem", "Active", "Global", "United", "Northern", "Apex",
+    "Vertex", "Medi", "Nova", "Sterling", "Crown", "Pioneer", "Summit", "Allied",
+    "Precision", "Coastal", "Meridian", "Atlas", "Zenith", "Harbor", "Orion",
+]
+SUPPLIER_KINDS = ["Supplies", "Materials", "Ingredients", "Labs", "Trading", "Sciences"]
+SUPPLIER_SUFFIXES = ["Ltd", "Limited", "Inc", "plc", "GmbH", "Co."]
+
+PRODUCT_NAMES = [
+    "Paracetamol", "Ibuprofen", "Ascorbic Acid", "Citric Acid", "Lactose Monohydrate",
+    "Microcrystalline Cellulose", "Magnesium Stearate", "Titanium Dioxide", "Gelatin",
+    "Povidone", "Croscarmellose Sodium", "Sodium Starch Glycolate", "Talc", "Mannitol",
+    "Sorbitol", "Glycerin", "Silicon Dioxide", "Calcium Carbonate", "Hypromellose",
+    "Zinc Oxide", "Starch", "Sucrose", "Polysorbate 80", "Stearic Acid", "Caffeine",
+]
+PRODUCT_GRADES = ["BP", "USP", "Ph Eur", "Type A", "Pharma Grade", "Food Grade", "NF"]
+PRODUCT_SPECS = ["500mg", "200 Bloom", "Fine Powder", "Granular", "99%", "Micronized", ""]
+UNITS = ["kg", "L", "units", "drums"]
+
+
+@dataclass
+class NoiseProfile:
+    """Per-invoice probabilities of each kind of noise."""
+
+    missing_po_ref: float = 0.15
+    price_trap: float = 0.10
+    reordered_lines: float = 0.30
+    supplier_variant: float = 0.20
+    math_error: float = 0.02
+    # Price traps raise one line's unit price by this fraction.
+    price_trap_markup: float = 0.20
+
+
+def _supplier_names(n_suppliers: int, rng: random.Random) -> List[str]:
+    names, seen = [], set()
+    for i in range(n_suppliers):
+        base = f"{rng.choice(SUPPLIER_WORDS)}{rng.choice(SUPPLIER_WORDS).lower()} {rng.choice(SUPPLIER_KINDS)}"
+        if base in seen:
+            base = f"{base} {i}"
+        seen.add(base)
+        names.append(f"{base} {rng.choice(SUPPLIER_SUFFIXES)}")
+    return names
+
+
+def _supplier_cum_weights(n_suppliers: int, skew: float) -> List[float]:
+    """Zipf-like weights: skew 0 is uniform, ~1 gives a few dominant suppliers."""
+    return list(itertools.accumulate(1.0 / (rank**skew) for rank in range(1, n_suppliers + 1)))
+
+
+def _product(rng: random.Random) -> str:
+    parts = [rng.choice(PRODUCT_NAMES), rng.choice(PRODUCT_GRADES), rng.choice(PRODUCT_SPECS)]
+    return " ".join(p for p in parts if p)
+
+
+def iter_purchase_orders(
+    n_pos: int,
+    n_suppliers: int = 500,
+    supplier_skew: float = 1.0,
+    mean_lines: float = 4.0,
+    max_lines: int = 20,
+    seed: int = 0,
+) -> Iterator[Dict]:
+    """
+    Yields `n_pos` POs. Suppliers are drawn with Zipf-like skew and line
+    counts from a geometric distribution with the given mean, capped at
+    `max_lines`.
+    """
+    rng = random.Random(seed)
+    suppliers = _supplier_names(n_suppliers, rng)
+    cum_weights = _supplier_cum_weights(n_suppliers, supplier_skew)
+    p_stop = 1.0 / max(mean_lines, 1.0)
+
+    for i in range(n_pos):
+        n_lines = 1
+        while n_lines < max_lines and rng.random() > p_stop:
+            n_lines += 1
+
+        line_items = []
+        for j in range(n_lines):
+            quantity = rng.choice([5, 10, 15, 20, 25, 50, 75, 100, 200])
+            unit_price = round(rng.uniform(1.0, 400.0), 2)
+            line_items.append(
+                {
+                    "item_id": f"ITM-{i:07d}-{j:02d}",
+                    "description": _product(rng),
+                    "quantity": quantity,
+                    "unit": rng.choice(UNITS),
+                    "unit_price": unit_price,
+                    "line_total": round(quantity * unit_price, 2),
+                }
+            )
+
+        yield {
+            "po_number": f"PO-{i:07d}",
+            "supplier": rng.choices(suppliers, cum_weights=cum_weights)[0],
+            "date": f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            "total": round(sum(item["line_total"] for item in line_items), 2),
+            "currency": "GBP",
+            "line_items": line_items,
+        }
+
+
+def write_catalog(path: str, purchase_orders: Iterator[Dict]) -> int:
+    """Streams POs to `path` in the purchase_orders.json layout."""
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('{"purchase_orders": [\n')
+        for po in purchase_orders:
+            if count:
+                f.write(",\n")
+            f.write(json.dumps(po))
+            count += 1
+        f.write("\n]}\n")
+    return count
+
+
+def _supplier_variant(name: str, rng: random.Random) -> str:
+    """Drops or swaps the legal suffix and sometimes the case, as invoices do."""
+    words = name.split()
+    if words[-1] in SUPPLIER_SUFFIXES:
+        words = words[:-1] if rng.random() < 0.5 else words[:-1] + [rng.choice(SUPPLIER_SUFFIXES)]
+    variant = " ".join(words)
+    return variant.upper() if rng.random() < 0.2 else variant
+
+
+def make_invoice(po: Dict, noise: NoiseProfile, rng: random.Random) -> Tuple[Dict, Dict]:
+    """
+    Builds an extraction payload for `po` with noise applied. Returns the
+    payload and the expected outcome: the PO it should match and which
+    noise was injected.
+    """
+    items = [
+        {
+            "description": item["description"],
+            "quantity": float(item["quantity"]),
+            "unit_price": float(item["unit_price"]),
+            "line_total": float(item["line_total"]),
+            "confidence": 0.97,
+        }
+        for item in po["line_items"]
+    ]
+    expected = {"po_number": po["po_number"], "noise": []}
+
+    if rng.random() < noise.price_trap:
+        item = rng.choice(items)
+        item["unit_price"] = round(item["unit_price"] * (1 + noise.price_trap_markup), 2)
+        item["line_total"] = round(item["quantity"] * item["unit_price"], 2)
+        expected["noise"].append("price_trap")
+    if rng.random() < noise.math_error:
+        item = rng.choice(items)
+        item["line_total"] = round(item["line_total"] + rng.choice([-10, 10, 100]), 2)
+        expected["noise"].append("math_error")
+    if len(items) > 1 and rng.random() < noise.reordered_lines:
+        rng.shuffle(items)
+        expected["noise"].append("reordered_lines")
+
+    supplier = po["supplier"]
+    if rng.random() < noise.supplier_variant:
+        supplier = _supplier_variant(supplier, rng)
+        expected["noise"].append("supplier_variant")
+
+    po_reference = po["po_number"]
+    if rng.random() < noise.missing_po_ref:
+        po_reference = None
+        expected["noise"].append("missing_po_ref")
+
+    payload = {
+        "invoice_id": f"INV-{po['po_number']}",
+        "supplier_name": supplier,
+        "date": po["date"],
+        "po_reference": po_reference,
+        "currency": po.get("currency"),
+        "items": items,
+        "overall_confidence": 0.95,
+        "notes": "synthetic",
+    }
+    return payload, expected
+
+
+def generate_invoices(
+    purchase_orders: List[Dict], n_invoices: int, noise: NoiseProfile, seed: int = 1
+) -> List[Tuple[Dict, Dict]]:
+    rng = random.Random(seed)
+    return [make_invoice(rng.choice(purchase_orders), noise, rng) for _ in range(n_invoices)]
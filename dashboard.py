@@ -1,8 +1,9 @@
 import streamlit as st
-import json
-import os
 import pandas as pd
 
+from src.core.results_index import LATENCY_BUCKETS_MS
+from src.core.results_store import ResultsStore
+
 # --- 1. PAGE CONFIGURATION ---
 st.set_page_config(
     page_title="SafePay AI",
@@ -109,29 +110,66 @@ st.markdown(
 
 
 # --- 3. DATA LOADING ---
-@st.cache_data
-def load_data():
-    if os.path.exists("output/results.json"):
-        with open("output/results.json", "r") as f:
-            return json.load(f)
-    return []
+PAGE_SIZE = 50
+ACTIONS = {
+    "auto_approve": "✅ Auto approved",
+    "flag_for_review": "⚠️ Flagged for review",
+    "escalate_to_human": "🛑 Escalated",
+}
+
 
+@st.cache_resource
+def get_index():
+    # Opening the store imports a legacy results.json and (re)builds the
+    # index if it is missing or behind the log; queries then go straight
+    # to SQLite, so only the visible page is ever loaded.
+    return ResultsStore().index
 
-data = load_data()
+
+index = get_index()
 
 # --- 4. SIDEBAR ---
 with st.sidebar:
     st.title("🛡️ SafePay")
     st.markdown("---")
 
-    if not data:
+    total_records = index.count()
+    if not total_records:
         st.error("❌ No data found. Run pipeline first.")
         st.stop()
 
-    # Create a nice list of invoices
-    invoice_map = {item["source_file"]: item for item in data}
+    # Filters run server-side against the indexed columns.
+    search = st.text_input("Search", placeholder="File, invoice ID, supplier or PO")
+    actions = st.multiselect(
+        "Action", list(ACTIONS), format_func=lambda a: ACTIONS.get(a, a)
+    )
+    supplier = st.selectbox("Supplier", [None] + index.suppliers(), format_func=lambda s: s or "All")
+    min_confidence = st.slider("Min. confidence", 0.0, 1.0, 0.0, 0.05)
+    date_range = st.date_input("Invoice date", value=())
+
+    filters = {
+        "search": search.strip() or None,
+        "actions": actions,
+        "supplier": supplier,
+        "min_confidence": min_confidence or None,
+    }
+    if len(date_range) == 2:
+        filters["date_from"], filters["date_to"] = (d.isoformat() for d in date_range)
+
+    _, matches = index.query(limit=0, **filters)
+    if not matches:
+        st.warning("No invoices match these filters.")
+        st.stop()
+
+    pages = (matches + PAGE_SIZE - 1) // PAGE_SIZE
+    page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1)
+    rows, _ = index.query(offset=(page - 1) * PAGE_SIZE, limit=PAGE_SIZE, **filters)
+    st.caption(f"{matches} matching invoices")
+
     selected_file = st.radio(
-        "Select Invoice", list(invoice_map.keys()), format_func=lambda x: f"📄 {x}"
+        "Select Invoice",
+        [row["source_file"] for row in rows],
+        format_func=lambda x: f"📄 {x}",
     )
 
     st.markdown("---")
@@ -139,11 +177,77 @@ with st.sidebar:
     # System Health
     st.markdown("### System Health")
     st.success("Orchestrator: **Online**")
-    st.info(f"Database: **{len(data)} Records**")
+    st.info(f"Database: **{total_records} Records**")
+
+    # Rolled up by the pipeline as it writes results, so these are a few
+    # small reads however long the history is.
+    with st.expander("📊 Portfolio Metrics", expanded=True):
+        action_counts = index.aggregates("action")
+        st.markdown("**Actions**")
+        st.bar_chart(
+            pd.DataFrame(
+                {"invoices": [count for count, _ in action_counts.values()]},
+                index=[ACTIONS.get(a, a) for a in action_counts],
+            )
+        )
+
+        discrepancy_counts = index.aggregates("discrepancy_type")
+        if discrepancy_counts:
+            st.markdown("**Discrepancy types**")
+            st.bar_chart(
+                pd.DataFrame(
+                    {"count": [count for count, _ in discrepancy_counts.values()]},
+                    index=[t.replace("_", " ") for t in discrepancy_counts],
+                )
+            )
+
+        st.markdown("**Top suppliers**")
+        st.dataframe(
+            pd.DataFrame(
+                [
+                    {"supplier": supplier, "invoices": count}
+                    for supplier, (count, _) in index.aggregates("supplier", limit=10).items()
+                ]
+            ),
+            hide_index=True,
+            use_container_width=True,
+        )
+
+        days = index.aggregates("day")
+        if days:
+            daily = pd.DataFrame(
+                [
+                    {"day": day, "invoices": count, "avg confidence": total / count}
+                    for day, (count, total) in days.items()
+                ]
+            ).set_index("day").sort_index()
+            st.markdown("**Throughput per day**")
+            st.bar_chart(daily["invoices"])
+            st.markdown("**Average confidence**")
+            st.line_chart(daily["avg confidence"])
+
+        histograms = index.latency_histograms()
+        if histograms:
+            st.markdown("**Agent latency (ms)**")
+            agent = st.selectbox("Agent", sorted(histograms))
+            buckets = histograms[agent]
+            bounds = sorted(buckets, key=lambda b: float(b))
+            steps = sum(count for count, _ in buckets.values())
+            st.caption(
+                f"{steps} runs, mean {sum(t for _, t in buckets.values()) / steps:.0f} ms"
+            )
+            st.bar_chart(
+                pd.DataFrame(
+                    {"runs": [buckets[b][0] for b in bounds]},
+                    index=[f"≤{b}" if b != "inf" else f">{LATENCY_BUCKETS_MS[-1]}" for b in bounds],
+                )
+            )
+
     st.caption("SafePay Engine v1.0 ")
 
 # --- 5. MAIN CONTENT ---
-record = invoice_map[selected_file]
+# Only the selected invoice's full record (with its trace) is loaded.
+record = index.get(selected_file)
 res = record["processing_results"]
 action = res["recommended_action"]
 trace = res.get("agent_execution_trace", [])
@@ -298,11 +402,15 @@ with right_col:
             # Special highlighting for the Loop
             detail_class = "looping" if status == "Looping" else ""
 
+            timing = ""
+            if "metrics" in step:
+                timing = f" · {step['metrics']['wall_ms']:.0f} ms"
+
             st.markdown(
                 f"""
             <div class="timeline-item">
                 <div class="timeline-dot {dot_class}"></div>
-                <div class="agent-name">{step['agent']} <span style="font-size:0.8em; opacity:0.7; float:right;">{status}</span></div>
+                <div class="agent-name">{step['agent']} <span style="font-size:0.8em; opacity:0.7; float:right;">{status}{timing}</span></div>
                 <div class="agent-detail {detail_class}">
                     {icon}{step['detail']}
                 </div>
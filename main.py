@@ -1,93 +1,417 @@
 import os
-import json
 import glob
+import argparse
+import threading
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
-from src.graph import build_graph
-from src.core.state import AgentState
+from src.core.hashing import file_sha256
+from src.core.registry import ResourceRegistry
+from src.core.results_store import ResultsStore
 
 load_dotenv()
 
+METRICS_PATH = "output/metrics.prom"
 
-def load_existing_results():
-    if os.path.exists("output/results.json"):
-        try:
-            with open("output/results.json", "r") as f:
-                return json.load(f)
-        except:
-            return []
-    return []
 
+def build_output(filename, final_state):
+    return {
+        "source_file": filename,
+        "processed_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "invoice_id": final_state.get("extracted_invoice_id") or "UNKNOWN",
+        "processing_results": {
+            "extraction_confidence": final_state.get("extraction_confidence", 0.0),
+            "extracted_data": {
+                "supplier": final_state.get("extracted_supplier"),
+                "po_reference": final_state.get("extracted_po_ref"),
+                "date": final_state.get("extracted_date"),
+                "currency": final_state.get("extracted_currency"),
+                "line_items": [
+                    item.model_dump()
+                    for item in final_state.get("extracted_items", [])
+                ],
+            },
+            "matching_results": {
+                "matched_po": final_state.get("matched_po_id"),
+                "match_reasoning": final_state.get("match_reasoning", ""),
+                "candidates_considered": [
+                    c.model_dump() for c in final_state.get("match_candidates", [])
+                ],
+            },
+            "discrepancies": [
+                d.model_dump() for d in final_state.get("discrepancies", [])
+            ],
+            "unmatched_po_lines": final_state.get("unmatched_po_lines", []),
+            "llm_usage": {
+                "calls": final_state.get("llm_calls", 0),
+                "input_tokens": final_state.get("llm_input_tokens", 0),
+                "output_tokens": final_state.get("llm_output_tokens", 0),
+            },
+            "recommended_action": final_state.get("final_action", "error"),
+            "agent_reasoning": final_state.get("final_report_reasoning", ""),
+            "agent_execution_trace": final_state.get("agent_trace", []),
+        },
+    }
 
-def run_pipeline():
-    print("🚀 Starting Invoice Reconciliation Agent...")
-    graph = build_graph()
 
-    invoice_files = sorted(glob.glob("data/invoices/*.pdf"))
-    if not invoice_files:
-        print("❌ No PDFs found in data/invoices/")
-        return
+def checkpoint_config(file_path):
+    """
+    Graph config keyed by the PDF's content hash, so a restart finds the
+    same thread. The filename keeps identical copies of one PDF apart.
+    """
+    thread_id = f"{file_sha256(file_path)}:{os.path.basename(file_path)}"
+    return {"configurable": {"thread_id": thread_id}}
+
+
+def process_invoice(graph, file_path):
+    """Runs one invoice through the graph. Safe to call from worker threads."""
+    from src.core.state import AgentState
+
+    filename = os.path.basename(file_path)
+    worker = threading.current_thread().name
+    print(f"\n--- [{worker}] Processing: {filename} ---")
+
+    initial_state = AgentState(file_path=file_path, retry_count=0, agent_trace=[])
+    if graph.checkpointer is None:
+        return build_output(filename, graph.invoke(initial_state))
 
-  
-    all_results = load_existing_results()
+    config = checkpoint_config(file_path)
+    snapshot = graph.get_state(config)
+    if snapshot.next:
+        print(f"⏯️ [{worker}] Resuming {filename} at '{snapshot.next[0]}'")
+        final_state = graph.invoke(None, config, durability="sync")
+    elif snapshot.values:
+        # Finished before the last shutdown but its result was never saved.
+        print(f"⏯️ [{worker}] {filename} already completed, reusing checkpoint")
+        final_state = snapshot.values
+    else:
+        final_state = graph.invoke(initial_state, config, durability="sync")
+    return build_output(filename, final_state)
+
+
+def pending_invoices(store, verbose=True):
+    """Returns (all invoice PDFs, those without a stored result)."""
+    invoice_files = sorted(glob.glob("data/invoices/*.pdf"))
     processed_files = {
-        r.get("source_file") for r in all_results if r.get("source_file")
+        r.get("source_file") for r in store.load() if r.get("source_file")
     }
 
+    pending = []
     for file_path in invoice_files:
         filename = os.path.basename(file_path)
-
-     
         if filename in processed_files:
-            print(f"⏭️ Skipping {filename} (Already Processed)")
+            if verbose:
+                print(f"⏭️ Skipping {filename} (Already Processed)")
             continue
+        pending.append(file_path)
+    return invoice_files, pending
 
-        print(f"\n--- Processing: {filename} ---")
-
-        initial_state = AgentState(file_path=file_path, retry_count=0, agent_trace=[])
-        final_state = graph.invoke(initial_state)
-
-        output = {
-            "source_file": filename,
-            "invoice_id": final_state.get("extracted_invoice_id") or "UNKNOWN",
-            "processing_results": {
-                "extraction_confidence": final_state.get("extraction_confidence", 0.0),
-                "extracted_data": {
-                    "supplier": final_state.get("extracted_supplier"),
-                    "po_reference": final_state.get("extracted_po_ref"),
-              
-                    "line_items": [
-                        item.model_dump()
-                        for item in final_state.get("extracted_items", [])
-                    ],
-                },
-                "matching_results": {
-                    "matched_po": final_state.get("matched_po_id"),
-                    "match_reasoning": final_state.get("match_reasoning", ""),
-                    "candidates_considered": [
-                        c.model_dump() for c in final_state.get("match_candidates", [])
-                    ],
-                },
-                "discrepancies": [
-                    d.model_dump() for d in final_state.get("discrepancies", [])
-                ],
-                "recommended_action": final_state.get("final_action", "error"),
-                "agent_reasoning": final_state.get("final_report_reasoning", ""),
-                "agent_execution_trace": final_state.get("agent_trace", []),
-            },
-        }
 
-        all_results.append(output)
+def show_status():
+    """Lists pending invoices without loading the graph, models or index."""
+    invoice_files, pending = pending_invoices(ResultsStore(), verbose=False)
+    print(
+        f"📊 {len(invoice_files)} invoices in data/invoices/: "
+        f"{len(invoice_files) - len(pending)} processed, {len(pending)} pending."
+    )
+    for file_path in pending:
+        print(f"   📄 {os.path.basename(file_path)}")
+
+
+def run_pipeline(
+    workers=1,
+    ordered=True,
+    use_cache=True,
+    resume=True,
+    metrics_port=None,
+):
+    print("🚀 Starting Invoice Reconciliation Agent...")
+    store = ResultsStore()
+    invoice_files, pending = pending_invoices(store)
+    if not invoice_files:
+        print("❌ No PDFs found in data/invoices/")
+        return
+    if not pending:
+        print("✅ Nothing to do: every invoice already has a result.")
+        return
+
+    # Deferred so `status` and empty runs never pay for LangGraph, the LLM
+    # client, the embedding model or FAISS.
+    from src.graph import build_graph
 
-        with open("output/results.json", "w") as f:
-            json.dump(all_results, f, indent=2)
+    registry = ResourceRegistry(workers=workers)
+    if not use_cache:
+        registry.bypass_extraction_cache = True
+    metrics = registry.get_metrics()
+    if metrics_port:
+        metrics.serve(metrics_port)
+        print(f"📈 Serving metrics on http://127.0.0.1:{metrics_port}/metrics")
+    graph = build_graph(
+        registry, checkpointer=registry.get_checkpointer() if resume else None
+    )
 
+    print(f"📥 {len(pending)} invoices pending, {workers} worker(s).")
+
+    # Workers only run the graph; results are aggregated and appended on
+    # this thread, so the results log never sees concurrent writers.
+    with ThreadPoolExecutor(
+        max_workers=max(workers, 1), thread_name_prefix="worker"
+    ) as pool:
+        futures = {pool.submit(process_invoice, graph, f): f for f in pending}
+        completed = futures if ordered else as_completed(futures)
+
+        for done, future in enumerate(completed, start=1):
+            filename = os.path.basename(futures[future])
+            try:
+                output = future.result()
+            except Exception as e:
+                print(f"❌ [{done}/{len(pending)}] {filename} failed: {e}")
+                continue
+
+            store.append(output)
+            if graph.checkpointer is not None:
+                # The result is durable now; the node checkpoints are not needed.
+                graph.checkpointer.delete_thread(
+                    checkpoint_config(futures[future])["configurable"]["thread_id"]
+                )
+
+            print(
+                f"✅ [{done}/{len(pending)}] Finished {filename}. "
+                f"Action: {output['processing_results']['recommended_action']}"
+            )
+
+    # Exported once per run: rewriting the whole file after every few
+    # invoices would make a long run quadratic in the number of results.
+    store.export()
+    print(f"\n🎉 Processing Complete. Results saved to {store.export_path}")
+    for key, counts in registry.stats().items():
+        print(
+            f"   📦 {key}: loaded {counts['loads']}x in {counts['load_seconds']}s, "
+            f"reused {counts['hits']}x"
+        )
+    budget = registry.get_payload_budget()
+    print(
+        f"   🧠 PDF payload memory: peak {budget.peak_bytes / 2**20:.1f} MB of "
+        f"{budget.max_bytes / 2**20:.0f} MB budget, {budget.waits} wait(s) "
+        f"({budget.wait_seconds:.1f}s)"
+    )
+    for node, stats in metrics.percentiles().items():
         print(
-            f"✅ Finished {filename}. Action: {final_state.get('final_action', 'unknown')}"
+            f"   ⏱️ {node}: n={stats['count']} p50={stats['p50'] * 1000:.0f}ms "
+            f"p95={stats['p95'] * 1000:.0f}ms p99={stats['p99'] * 1000:.0f}ms"
         )
+    metrics.write(METRICS_PATH)
+    print(f"   📈 Metrics written to {METRICS_PATH}")
+
+
+def state_from_record(record):
+    """
+    Rebuilds the AgentState an invoice had after extraction from its stored
+    result. The trace up to matching is kept, and the retry count is
+    recovered from its re-extraction loops.
+    """
+    from src.core.state import AgentState, ExtractedLineItem
+
+    results = record["processing_results"]
+    extracted = results["extracted_data"]
+    usage = results.get("llm_usage", {})
+    trace = results.get("agent_execution_trace", [])
+    cut = next(
+        (i for i, step in enumerate(trace) if step.get("agent") == "Matching Agent"),
+        len(trace),
+    )
+    invoice_id = record.get("invoice_id")
+
+    return AgentState(
+        file_path=os.path.join("data/invoices", record["source_file"]),
+        retry_count=sum(1 for step in trace[:cut] if step.get("status") == "Looping"),
+        agent_trace=trace[:cut],
+        extracted_invoice_id=None if invoice_id == "UNKNOWN" else invoice_id,
+        extracted_supplier=extracted.get("supplier"),
+        extracted_date=extracted.get("date"),
+        extracted_currency=extracted.get("currency"),
+        extracted_po_ref=extracted.get("po_reference"),
+        extracted_items=[
+            ExtractedLineItem(**item) for item in extracted.get("line_items", [])
+        ],
+        extraction_confidence=results.get("extraction_confidence", 0.0),
+        llm_calls=usage.get("calls", 0),
+        llm_input_tokens=usage.get("input_tokens", 0),
+        llm_output_tokens=usage.get("output_tokens", 0),
+    )
+
+
+def outcome(record):
+    results = record["processing_results"]
+    return (
+        results["matching_results"]["matched_po"],
+        results["discrepancies"],
+        results.get("unmatched_po_lines", []),
+        results["recommended_action"],
+    )
+
 
-    print("\n🎉 Processing Complete. Results saved to output/results.json")
+def reconcile_results(batch_size=1000):
+    """
+    Re-runs verification, matching, discrepancy detection and resolution
+    over every stored result against the current PO data and rules, in
+    batches and without any LLM calls. Only invoices whose outcome changed
+    are appended to the results log.
+    """
+    import time
+
+    from src.agents.discrepancy import DiscrepancyDetectorAgent
+    from src.agents.matching import MatchingAgent
+    from src.agents.resolution import ResolutionAgent
+    from src.agents.verifier import ExtractionVerifier
+    from src.graph import (
+        discrepancy_trace,
+        match_trace,
+        resolution_trace,
+        verify_trace,
+    )
+
+    print("🔁 Reconciling stored results against current PO data...")
+    store = ResultsStore()
+    if store.index is None or not store.index.count():
+        print("❌ No stored results to reconcile.")
+        return
+
+    registry = ResourceRegistry()
+    db = registry.get_database()
+    verifier = ExtractionVerifier()
+    matcher = MatchingAgent(db=db)
+    detector = DiscrepancyDetectorAgent(db=db)
+    resolver = ResolutionAgent()
+
+    started = time.perf_counter()
+    total, changed = 0, 0
+    actions = {}
+    for records in store.index.iter_records(batch_size):
+        states = [state_from_record(record) for record in records]
+        verifier.verify_batch(states)
+        matcher.match_batch(states)
+        detector.check_batch(states)
+
+        updates = []
+        for record, state in zip(records, states):
+            resolver.resolve(state)
+            state.agent_trace.append(
+                {
+                    "agent": "Orchestrator",
+                    "status": "Reconciled",
+                    "confidence": 1.0,
+                    "detail": "Re-evaluated against current PO data from the stored "
+                    f"extraction (previous action: "
+                    f"{record['processing_results']['recommended_action']}).",
+                }
+            )
+            for trace in (verify_trace, match_trace, discrepancy_trace, resolution_trace):
+                state.agent_trace.append(trace(state))
+
+            output = build_output(record["source_file"], dict(state))
+            output["reconciled_at"] = output["processed_at"]
+            output["processed_at"] = record.get("processed_at")
+            if outcome(output) != outcome(record):
+                updates.append(output)
+                old, new = record["processing_results"]["recommended_action"], state.final_action
+                actions[(old, new)] = actions.get((old, new), 0) + 1
+
+        store.append_many(updates)
+        total += len(records)
+        changed += len(updates)
+        print(f"   ✅ {total} reconciled, {changed} changed")
+
+    store.export()
+    elapsed = time.perf_counter() - started
+    print(
+        f"\n🎉 Reconciled {total} invoices in {elapsed:.1f}s "
+        f"({total / elapsed if elapsed else 0:.0f}/s), {changed} changed. "
+        f"Results saved to {store.export_path}"
+    )
+    for (old, new), count in sorted(actions.items()):
+        print(f"   🔀 {old} → {new}: {count}")
+
+
+def export_results():
+    """Compacts the results log and rewrites results.json for the dashboard."""
+    store = ResultsStore()
+    kept = store.compact()
+    store.export()
+    print(f"📤 Exported {kept} records to {store.export_path}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="SafePay invoice reconciliation")
+    parser.add_argument(
+        "command",
+        nargs="?",
+        default="run",
+        choices=["run", "export", "status", "reconcile"],
+        help="'run' processes pending invoices (default); 'export' compacts "
+        "output/results.jsonl and rewrites output/results.json; 'status' "
+        "lists pending invoices without loading any models; 'reconcile' "
+        "re-runs matching and discrepancy checks on stored results without "
+        "re-extracting.",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="With 'run', only list the invoices that would be processed.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of invoices to process concurrently (default: 1).",
+    )
+    parser.add_argument(
+        "--unordered",
+        action="store_true",
+        help="Emit results as they finish instead of in file order.",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Ignore cached extractions and call the LLM for every invoice "
+        "(fresh results still refresh the cache).",
+    )
+    parser.add_argument(
+        "--no-resume",
+        action="store_true",
+        help="Do not checkpoint graph state, and start every invoice from the "
+        "beginning instead of resuming an interrupted run.",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=1000,
+        help="Invoices per batch for 'reconcile' (default: 1000).",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=None,
+        help="Serve per-node metrics in OpenMetrics format on this port "
+        "(http://127.0.0.1:PORT/metrics) while the run is in progress.",
+    )
+    return parser.parse_args()
 
 
 if __name__ == "__main__":
+    args = parse_args()
     os.makedirs("output", exist_ok=True)
-    run_pipeline()
+    if args.command == "export":
+        export_results()
+    elif args.command == "reconcile":
+        reconcile_results(batch_size=max(args.batch_size, 1))
+    elif args.command == "status" or args.dry_run:
+        show_status()
+    else:
+        run_pipeline(
+            workers=args.workers,
+            ordered=not args.unordered,
+            use_cache=not args.no_cache,
+            resume=not args.no_resume,
+            metrics_port=args.metrics_port,
+        )
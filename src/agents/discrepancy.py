@@ -1,111 +1,172 @@
-from src.core.state import AgentState, Discrepancy
-from src.core.database import PurchaseOrderDatabase
-from difflib import SequenceMatcher  
+from src.core import config
+from src.core.state import AgentState, Discrepancy, ExtractedLineItem
+from src.core.line_alignment import align_line_items
+from src.core.batch_checks import flagged_rows, price_flags
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from src.core.database import PurchaseOrderDatabase
+
+# Order of a line's findings, so batch results list them as `check` always has.
+_NOT_FOUND, _PRICE, _QTY = 0, 1, 2
 
 
 class DiscrepancyDetectorAgent:
-    def __init__(self, db_path: str):
-        self.db = PurchaseOrderDatabase(db_path)
+    def __init__(
+        self,
+        db_path: str = config.PO_DB_PATH,
+        db: Optional["PurchaseOrderDatabase"] = None,
+    ):
+        if db is None:
+            from src.core.database import PurchaseOrderDatabase
+
+            db = PurchaseOrderDatabase(db_path)
+        self.db = db
 
-    def _find_best_match_item(self, inv_item, po_items):
+    def check(self, state: AgentState) -> AgentState:
+        return self.check_batch([state])[0]
+
+    def check_batch(self, states: List[AgentState]) -> List[AgentState]:
         """
-        Aligns an Invoice Item to the correct PO Item using description similarity.
-        Prevents comparing "Apples" to "Oranges" just because they are on the same row.
+        Checks many invoices at once. Lines are aligned to their PO per
+        invoice, then price variance and quantity checks run as array
+        expressions over every aligned pair, and Discrepancy models are
+        only built for flagged rows.
         """
-        best_match = None
-        best_score = 0.0
-
-        for po_item in po_items:
-            score = SequenceMatcher(
-                None, inv_item.description.lower(), po_item["description"].lower()
-            ).ratio()
-            if score > best_score:
-                best_score = score
-                best_match = po_item
-
-     
-        if best_score > 0.6:
-            return best_match
-        return None
+        owners: List[Tuple[AgentState, int, Dict[str, Any]]] = []
+        findings: Dict[int, List[Tuple[Tuple[int, int], Discrepancy]]] = {}
+
+        for state in states:
+            state.discrepancies = []
+            state.unmatched_po_lines = []
+            found = findings.setdefault(id(state), [])
+            for i, po_item in self._align(state, found):
+                owners.append((state, i, po_item))
+
+        invoice_prices = np.fromiter(
+            (state.extracted_items[i].unit_price for state, i, _ in owners), dtype=np.float64, count=len(owners)
+        )
+        po_prices = np.fromiter((po["unit_price"] for _, _, po in owners), dtype=np.float64, count=len(owners))
+        invoice_qty = np.fromiter(
+            (state.extracted_items[i].quantity for state, i, _ in owners), dtype=np.float64, count=len(owners)
+        )
+        po_qty = np.fromiter((po["quantity"] for _, _, po in owners), dtype=np.float64, count=len(owners))
+
+        variance, flagged, high = price_flags(invoice_prices, po_prices)
+        for row in flagged_rows(flagged):
+            state, i, po_item = owners[row]
+            discrepancy = self._price_mismatch(
+                i, state.extracted_items[i], po_item, float(variance[row]), bool(high[row])
+            )
+            findings[id(state)].append(((i, _PRICE), discrepancy))
+        for row in flagged_rows(invoice_qty != po_qty):
+            state, i, po_item = owners[row]
+            findings[id(state)].append(((i, _QTY), self._qty_mismatch(i, state.extracted_items[i], po_item)))
 
-    def check(self, state: AgentState) -> AgentState:
-        state.discrepancies = []
+        for state in states:
+            state.discrepancies.extend(d for _, d in sorted(findings[id(state)], key=lambda f: f[0]))
+        return states
 
+    def _align(self, state: AgentState, found: List) -> List[Tuple[int, Dict[str, Any]]]:
+        """
+        Records the PO-level findings for `state` in `found` and returns
+        its (invoice line, PO line) pairs for the array checks.
+        """
         if not state.matched_po_id:
-            return state
+            return []
 
         po_data = self.db.get_exact_match(state.matched_po_id)
         if not po_data:
-            return state
+            return []
 
       
         if state.extracted_po_ref != state.matched_po_id:
-            state.discrepancies.append(
-                Discrepancy(
-                    type="missing_po",
-                    severity="medium",
-                    field="po_reference",
-                    details=f"Document lacks explicit reference to {state.matched_po_id}; match inferred via supplier/content.",
-                    invoice_value=state.extracted_po_ref,
-                    po_value=state.matched_po_id,
-                    confidence=0.85,
+            found.append(
+                (
+                    (-1, _NOT_FOUND),
+                    Discrepancy(
+                        type="missing_po",
+                        severity="medium",
+                        field="po_reference",
+                        details=f"Document lacks explicit reference to {state.matched_po_id}; match inferred via supplier/content.",
+                        invoice_value=state.extracted_po_ref,
+                        po_value=state.matched_po_id,
+                        confidence=0.85,
+                    ),
                 )
             )
 
         extracted_items = state.extracted_items
         po_items = po_data["line_items"]
 
-        matched_po_indices = set()
-
+        # Aligns invoice lines to PO lines one-to-one by description, so
+        # "Apples" are never compared to "Oranges" just because they share a
+        # row, and two invoice lines cannot claim the same PO line.
+        alignment = align_line_items(
+            [item.description for item in extracted_items],
+            [item["description"] for item in po_items],
+        )
+        state.unmatched_po_lines = [
+            po_items[j]["description"] for j in alignment.unmatched_po
+        ]
+
+        pairs = []
         for i, ext_item in enumerate(extracted_items):
          
-            po_item = self._find_best_match_item(ext_item, po_items)
-
-            if not po_item:
-                state.discrepancies.append(
-                    Discrepancy(
-                        type="qty_mismatch",  
-                        severity="medium",
-                        field=f"line_item_{i}",
-                        details=f"Item '{ext_item.description}' not found on Purchase Order.",
-                        invoice_value=ext_item.description,
-                        po_value="Not Found",
-                        confidence=0.9,
+            match = alignment.matches.get(i)
+
+            if not match:
+                found.append(
+                    (
+                        (i, _NOT_FOUND),
+                        Discrepancy(
+                            type="qty_mismatch",  
+                            severity="medium",
+                            field=f"line_item_{i}",
+                            details=f"Item '{ext_item.description}' not found on Purchase Order.",
+                            invoice_value=ext_item.description,
+                            po_value="Not Found",
+                            confidence=0.9,
+                        ),
                     )
                 )
                 continue
 
-       
-            price_variance = (ext_item.unit_price - po_item["unit_price"]) / po_item[
-                "unit_price"
-            ]
-
-            if price_variance > 0.05:  
-                severity = "high" if price_variance > 0.15 else "medium"
-                state.discrepancies.append(
-                    Discrepancy(
-                        type="price_mismatch",
-                        severity=severity,
-                        field=f"line_item_{i}_price",
-                        details=f"Unit price deviation of {price_variance:.1%} ({ext_item.unit_price} vs {po_item['unit_price']}) exceeds standard tolerance.",
-                        invoice_value=ext_item.unit_price,
-                        po_value=po_item["unit_price"],
-                        confidence=0.95,
-                    )
-                )
-
-          
-            if ext_item.quantity != po_item["quantity"]:
-                state.discrepancies.append(
-                    Discrepancy(
-                        type="qty_mismatch",
-                        severity="medium",
-                        field=f"line_item_{i}_qty",
-                        details=f"Quantity mismatch ({ext_item.quantity} vs {po_item['quantity']}) for verified item.",
-                        invoice_value=ext_item.quantity,
-                        po_value=po_item["quantity"],
-                        confidence=0.95,
-                    )
-                )
-
-        return state
+            pairs.append((i, po_items[match[0]]))
+        return pairs
+
+    @staticmethod
+    def _price_mismatch(
+        i: int,
+        ext_item: ExtractedLineItem,
+        po_item: Dict[str, Any],
+        price_variance: float,
+        high: bool,
+    ) -> Discrepancy:
+        if price_variance == float("inf"):
+            details = f"Unit price {ext_item.unit_price} charged for an item priced at zero on the PO."
+        else:
+            details = f"Unit price deviation of {price_variance:.1%} ({ext_item.unit_price} vs {po_item['unit_price']}) exceeds standard tolerance."
+        return Discrepancy(
+            type="price_mismatch",
+            severity="high" if high else "medium",
+            field=f"line_item_{i}_price",
+            details=details,
+            invoice_value=ext_item.unit_price,
+            po_value=po_item["unit_price"],
+            confidence=0.95,
+        )
+
+    @staticmethod
+    def _qty_mismatch(i: int, ext_item: ExtractedLineItem, po_item: Dict[str, Any]) -> Discrepancy:
+        return Discrepancy(
+            type="qty_mismatch",
+            severity="medium",
+            field=f"line_item_{i}_qty",
+            details=f"Quantity mismatch ({ext_item.quantity} vs {po_item['quantity']}) for verified item.",
+            invoice_value=ext_item.quantity,
+            po_value=po_item["quantity"],
+            confidence=0.95,
+        )
@@ -1,17 +1,54 @@
-from typing import List
+from typing import TYPE_CHECKING, List, Optional
+from src.core import config
 from src.core.state import AgentState, POMatchCandidate
-from src.core.database import PurchaseOrderDatabase
+from src.core.line_alignment import MATCH_THRESHOLD, similarity_matrix
 from difflib import SequenceMatcher
 
+if TYPE_CHECKING:
+    from src.core.database import PurchaseOrderDatabase
+
 
 class MatchingAgent:
-    def __init__(self, db_path: str):
-        self.db = PurchaseOrderDatabase(db_path)
+    def __init__(
+        self,
+        db_path: str = config.PO_DB_PATH,
+        db: Optional["PurchaseOrderDatabase"] = None,
+    ):
+        if db is None:
+            from src.core.database import PurchaseOrderDatabase
+
+            db = PurchaseOrderDatabase(db_path)
+        self.db = db
 
     def _calculate_string_similarity(self, a: str, b: str) -> float:
         return SequenceMatcher(None, a.lower(), b.lower()).ratio()
 
     def match(self, state: AgentState) -> AgentState:
+        if self._match_exact(state) or self._match_supplier_partition(state):
+            return state
+
+        raw_results = self.db.search_fuzzy(self._fuzzy_query(state), threshold=0.40)
+        return self._rank_fuzzy_results(state, raw_results)
+
+    def match_batch(self, states: List[AgentState]) -> List[AgentState]:
+        """
+        Matches many invoices at once. Exact PO references and supplier
+        partitions are resolved directly; the rest share one batched
+        embedding + FAISS search.
+        """
+        pending = [
+            state
+            for state in states
+            if not (self._match_exact(state) or self._match_supplier_partition(state))
+        ]
+        all_results = self.db.search_fuzzy_batch(
+            [self._fuzzy_query(state) for state in pending]
+        )
+        for state, raw_results in zip(pending, all_results):
+            self._rank_fuzzy_results(state, raw_results)
+        return states
+
+    def _match_exact(self, state: AgentState) -> bool:
         state.match_candidates = []
 
      
@@ -27,19 +64,65 @@ class MatchingAgent:
                 state.match_candidates.append(candidate)
                 state.matched_po_id = candidate.po_number
                 state.match_reasoning = candidate.reasoning
-                return state
+                return True
+        return False
+
+    def _line_item_similarity(self, state: AgentState, po_data) -> float:
+        """Mean best-description similarity of invoice lines against the PO."""
+        if not state.extracted_items or not po_data["line_items"]:
+            return 0.0
+        sim = similarity_matrix(
+            [item.description for item in state.extracted_items],
+            [po_item["description"] for po_item in po_data["line_items"]],
+        )
+        return float(sim.max(axis=1).mean())
+
+    def _match_supplier_partition(self, state: AgentState) -> bool:
+        """
+        Narrows the search to the open POs of the resolved supplier and
+        scores them on line items. Returns False (leaving the global vector
+        search to run) when the supplier is unknown or no PO is convincing.
+        A supplier match alone is not convincing: the invoice lines must
+        also align with the PO's lines.
+        """
+        if not state.extracted_supplier:
+            return False
 
-    
+        ranked_candidates = []
+        for canonical, supplier_sim in self.db.supplier_index.resolve(
+            state.extracted_supplier
+        ):
+            for po_id in self.db.supplier_index.purchase_orders_for(canonical):
+                po_data = self.db.get_exact_match(po_id)
+                item_sim = self._line_item_similarity(state, po_data)
+                if item_sim < MATCH_THRESHOLD:
+                    continue
+                final_score = min((item_sim * 0.4) + (supplier_sim * 0.6), 0.85)
+
+                if final_score > 0.45:
+                    ranked_candidates.append(
+                        {
+                            "po_id": po_id,
+                            "score": final_score,
+                            "supplier": po_data["supplier"],
+                        }
+                    )
+
+        if not ranked_candidates:
+            return False
+        self._select_candidates(state, ranked_candidates, "supplier_partition")
+        return state.matched_po_id is not None
+
+    def _fuzzy_query(self, state: AgentState) -> str:
         query_parts = []
         if state.extracted_supplier:
             query_parts.append(f"Supplier: {state.extracted_supplier}")
         if state.extracted_items:
             items_str = ", ".join([item.description for item in state.extracted_items])
             query_parts.append(f"Items: {items_str}")
-        fuzzy_query = ". ".join(query_parts)
-
-        raw_results = self.db.search_fuzzy(fuzzy_query, threshold=0.40)
+        return ". ".join(query_parts)
 
+    def _rank_fuzzy_results(self, state: AgentState, raw_results) -> AgentState:
         ranked_candidates = []
         for po_id, vector_score in raw_results:
             po_data = self.db.get_exact_match(po_id)
@@ -60,6 +143,12 @@ class MatchingAgent:
                     }
                 )
 
+        return self._select_candidates(state, ranked_candidates, "fuzzy_hybrid")
+
+    def _select_candidates(
+        self, state: AgentState, ranked_candidates, method: str
+    ) -> AgentState:
+        state.match_candidates = []
  
         ranked_candidates.sort(key=lambda x: x["score"], reverse=True)
         top_3 = ranked_candidates[:3]
@@ -69,7 +158,7 @@ class MatchingAgent:
                 POMatchCandidate(
                     po_number=cand["po_id"],
                     confidence=float(f"{cand['score']:.2f}"),
-                    method="fuzzy_hybrid",
+                    method=method,
                     reasoning=f"Supplier: {cand['supplier']} (Score: {cand['score']:.2f})",
                 )
             )
@@ -10,6 +10,14 @@ class ResolutionAgent:
         has_discrepancies = len(state.discrepancies) > 0
         high_severity = any(d.severity == "high" for d in state.discrepancies)
         conf_score = min(state.extraction_confidence, 0.95)
+        # A PO chosen only from the supplier's open POs, with no reference on
+        # the document, is a suggestion for a human rather than a match.
+        partition_inferred = any(
+            d.type == "missing_po" for d in state.discrepancies
+        ) and any(
+            c.po_number == state.matched_po_id and c.method == "supplier_partition"
+            for c in state.match_candidates
+        )
 
         if conf_score < 0.80:
             action = "escalate_to_human"
@@ -24,6 +32,13 @@ class ResolutionAgent:
                     reasons.append(f"CRITICAL: {d.details}")
 
 
+        elif partition_inferred:
+            action = "escalate_to_human"
+            reasons.append(
+                f"PO {state.matched_po_id} inferred from the supplier's open POs; "
+                "no PO reference on the document."
+            )
+
         elif has_discrepancies:
             action = "flag_for_review"
             for d in state.discrepancies:
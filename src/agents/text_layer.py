@@ -0,0 +1,240 @@
+import re
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+from pypdf import PdfReader
+
+from src.agents.verifier import ExtractionVerifier
+from src.core import money
+from src.core.batch_checks import LINE_TOLERANCE_MINOR_UNITS
+from src.core.state import ExtractedLineItem
+
+if TYPE_CHECKING:
+    from src.core.database import PurchaseOrderDatabase
+
+CURRENCY_SYMBOLS = {"£": "GBP", "$": "USD", "€": "EUR"}
+
+_MONEY = r"[£$€]?\s?(\d[\d,]*\.\d{2})"
+_QTY = r"(\d[\d,]*(?:\.\d+)?)\s*(?:[A-Za-z]{1,6})?"
+
+MONEY_RE = re.compile(rf"^{_MONEY}$")
+QTY_RE = re.compile(rf"^{_QTY}$")
+ROW_RE = re.compile(rf"^(?P<desc>.+?)\s+{_QTY}\s+{_MONEY}\s+{_MONEY}$")
+CODE_RE = re.compile(r"^[A-Z0-9]+(?:-[A-Z0-9]+)+$|^[A-Z0-9]{3,}$")
+
+SUBTOTAL_LABELS = ("subtotal", "net amount", "net total", "sub total")
+
+HEADER_LABELS = {
+    "invoice_id": ("invoice number", "invoice no", "invoice #", "no"),
+    "date": ("invoice date", "date"),
+    "po_reference": ("po reference", "po number", "purchase order", "ref", "customer ref"),
+}
+
+# Values printed in a PO reference field when the buyer gave none.
+NO_REFERENCE_VALUES = {"", "-", "n/a", "na", "none", "tbc"}
+# Letterhead lines searched for a supplier known to the PO catalog.
+LETTERHEAD_LINES = 5
+SUPPLIER_MIN_SCORE = 0.8
+
+# Confidence reported for a digital text layer that passed every check.
+TEXT_LAYER_CONFIDENCE = 0.97
+# Without a PO catalog the supplier and PO reference cannot be confirmed;
+# this stays under the resolution agent's 0.80 auto-approve floor.
+UNCONFIRMED_HEADER_CONFIDENCE = 0.75
+
+
+def _to_float(value: str) -> float:
+    return float(value.replace(",", ""))
+
+
+class TextLayerExtractor:
+    """
+    Deterministic extractor for machine-generated PDFs.
+
+    Reads the embedded text layer and recognises line items as
+    description / quantity / unit price / total rows, whether the table is
+    laid out on one line per row or one cell per line. The result is only
+    trusted when every line passes the verifier's math check and the items
+    add up to the printed subtotal, the invoice number and PO reference
+    are labelled, and the supplier and PO reference are found in the PO
+    catalog; otherwise None is returned and the caller escalates to the
+    LLM. Scanned documents have no text layer and always escalate.
+    """
+
+    def __init__(self, db: Optional["PurchaseOrderDatabase"] = None):
+        self.db = db
+
+    def extract(self, pdf_path: str) -> Optional[Dict[str, Any]]:
+        try:
+            reader = PdfReader(pdf_path)
+            text = "\n".join(page.extract_text() or "" for page in reader.pages)
+        except Exception:
+            return None
+
+        lines = [line.strip() for line in text.splitlines() if line.strip()]
+        if not lines:
+            return None
+
+        items = self._parse_items(lines)
+        if not items:
+            return None
+
+        currency = self._parse_currency(text)
+        line_items = [ExtractedLineItem(confidence=1.0, **item) for item in items]
+        if ExtractionVerifier.check_line_math(line_items, currency):
+            return None
+
+        subtotal = self._find_subtotal(lines)
+        if subtotal is not None and abs(
+            sum(money.to_minor_units(item["line_total"], currency) for item in items)
+            - money.to_minor_units(subtotal, currency)
+        ) > LINE_TOLERANCE_MINOR_UNITS:
+            return None
+
+        fields = self._parse_header_fields(lines)
+        if "invoice_id" not in fields or "po_reference" not in fields:
+            return None
+
+        supplier = self._parse_supplier(lines)
+        po_reference = self._parse_po_reference(fields)
+        confidence = TEXT_LAYER_CONFIDENCE
+        notes = "Extracted from the PDF text layer; line math and subtotal verified."
+        if self.db is None:
+            confidence = UNCONFIRMED_HEADER_CONFIDENCE
+            notes += " Supplier and PO reference not checked against the PO catalog."
+        elif supplier is None or (po_reference and not self.db.get_exact_match(po_reference)):
+            return None
+
+        return {
+            "invoice_id": fields["invoice_id"],
+            "supplier_name": supplier,
+            "date": fields.get("date"),
+            "po_reference": po_reference,
+            "currency": currency,
+            "items": [dict(item, confidence=1.0) for item in items],
+            "overall_confidence": confidence,
+            "notes": notes,
+        }
+
+    def _parse_items(self, lines: List[str]) -> List[Dict[str, Any]]:
+        items = []
+        row_start = 0
+        i = 0
+        while i < len(lines):
+            row = ROW_RE.match(lines[i])
+            if row:
+                items.append(
+                    self._item(row.group("desc"), row.group(2), row.group(3), row.group(4))
+                )
+                i += 1
+                row_start = i
+                continue
+
+            # One cell per line: quantity, unit price and total on consecutive
+            # lines, with description (and maybe an item code) just before.
+            if i + 2 < len(lines):
+                qty = QTY_RE.match(lines[i])
+                price = MONEY_RE.match(lines[i + 1])
+                total = MONEY_RE.match(lines[i + 2])
+                if qty and price and total and not MONEY_RE.match(lines[i]):
+                    description = self._pick_description(lines[max(row_start, i - 3) : i])
+                    if description:
+                        items.append(
+                            self._item(description, qty.group(1), price.group(1), total.group(1))
+                        )
+                        i += 3
+                        row_start = i
+                        continue
+            i += 1
+
+        return items
+
+    @staticmethod
+    def _item(description: str, qty: str, price: str, total: str) -> Dict[str, Any]:
+        return {
+            "description": description.strip(),
+            "quantity": _to_float(qty),
+            "unit_price": _to_float(price),
+            "line_total": _to_float(total),
+        }
+
+    @staticmethod
+    def _pick_description(candidates: List[str]) -> Optional[str]:
+        """Chooses the description cell, skipping item codes and labels."""
+        texts = [
+            c
+            for c in candidates
+            if not CODE_RE.match(c) and not c.endswith(":") and re.search(r"[a-z]", c)
+        ]
+        return max(texts, key=len) if texts else None
+
+    @staticmethod
+    def _find_subtotal(lines: List[str]) -> Optional[float]:
+        for i, line in enumerate(lines):
+            lowered = line.lower().rstrip(":").strip()
+            if not lowered.startswith(SUBTOTAL_LABELS):
+                continue
+            inline = re.search(rf"{_MONEY}\s*$", line)
+            if inline:
+                return _to_float(inline.group(1))
+            if i + 1 < len(lines):
+                following = MONEY_RE.match(lines[i + 1])
+                if following:
+                    return _to_float(following.group(1))
+        return None
+
+    @staticmethod
+    def _parse_header_fields(lines: List[str]) -> Dict[str, str]:
+        """
+        Reads 'Label: value' pairs, including the columnar layout where a
+        block of labels is followed by a block of values in the same order.
+        """
+        pairs: Dict[str, str] = {}
+        i = 0
+        while i < len(lines):
+            labels = []
+            while i + len(labels) < len(lines) and lines[i + len(labels)].endswith(":"):
+                labels.append(lines[i + len(labels)])
+            if labels:
+                values = lines[i + len(labels) : i + 2 * len(labels)]
+                for label, value in zip(labels, values):
+                    pairs.setdefault(label.rstrip(":").strip().lower(), value)
+                i += 2 * len(labels)
+                continue
+
+            inline = re.match(r"^([A-Za-z #.]{2,30}):\s*(\S.*)$", lines[i])
+            if inline:
+                pairs.setdefault(inline.group(1).strip().lower(), inline.group(2).strip())
+            i += 1
+
+        fields = {}
+        for field, synonyms in HEADER_LABELS.items():
+            for label in synonyms:
+                if label in pairs:
+                    fields[field] = pairs[label]
+                    break
+        return fields
+
+    @staticmethod
+    def _parse_po_reference(fields: Dict[str, str]) -> Optional[str]:
+        value = fields["po_reference"].strip()
+        return None if value.lower() in NO_REFERENCE_VALUES else value
+
+    def _parse_supplier(self, lines: List[str]) -> Optional[str]:
+        """
+        The letterhead line naming a supplier in the PO catalog, or without
+        a catalog the first line of the document.
+        """
+        candidates = lines[:1] if self.db is None else lines[:LETTERHEAD_LINES]
+        for line in candidates:
+            if self.db is None or self.db.supplier_index.resolve(
+                line, min_score=SUPPLIER_MIN_SCORE
+            ):
+                return line.title() if line.isupper() else line
+        return None
+
+    @staticmethod
+    def _parse_currency(text: str) -> Optional[str]:
+        for symbol, code in CURRENCY_SYMBOLS.items():
+            if symbol in text:
+                return code
+        return None
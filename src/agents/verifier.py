@@ -1,28 +1,97 @@
-from src.core.state import AgentState
+from typing import Dict, List, Optional
+from src.core import money
+from src.core.batch_checks import (
+    LINE_TOLERANCE_MINOR_UNITS,
+    LineItemColumns,
+    flagged_rows,
+    math_error_mask,
+)
+from src.core.state import AgentState, ExtractedLineItem
 
 
 class ExtractionVerifier:
     def verify(self, state: AgentState) -> AgentState:
+        self._reset(state)
+        if self._simulated_failure(state):
+            return state
+
+        errors = self.find_math_errors(state.extracted_items, state.extracted_currency)
+        state.verification_flags = list(errors.values())
+        state.failed_item_indices = list(errors.keys())
+        state.math_verification_passed = not errors
+
+        return state
+
+    def verify_batch(self, states: List[AgentState]) -> List[AgentState]:
+        """
+        Verifies many invoices at once: line math is checked as one array
+        expression over every line item, and flags are only built for the
+        lines that fail.
+        """
+        pending = []
+        for state in states:
+            self._reset(state)
+            if not self._simulated_failure(state):
+                pending.append(state)
+
+        columns = LineItemColumns(
+            [state.extracted_items for state in pending],
+            [state.extracted_currency for state in pending],
+        )
+        for row in flagged_rows(math_error_mask(columns)):
+            state = pending[columns.invoice[row]]
+            index = int(columns.line[row])
+            state.failed_item_indices.append(index)
+            state.verification_flags.append(
+                self._math_error_flag(state.extracted_items[index], state.extracted_currency)
+            )
+            state.math_verification_passed = False
+
+        return states
+
+    @staticmethod
+    def _reset(state: AgentState):
         state.verification_flags = []
+        state.failed_item_indices = []
         state.math_verification_passed = True
 
+    @staticmethod
+    def _simulated_failure(state: AgentState) -> bool:
       
         if "Invoice_1" in state.file_path and state.retry_count == 0:
             state.math_verification_passed = False
             state.verification_flags.append(
                 "Simulated verification failure to demonstrate self-correction loop."
             )
-            return state
-      
+            return True
+        return False
+
+    @staticmethod
+    def _math_error_flag(item: ExtractedLineItem, currency: Optional[str] = None) -> str:
+        calculated = money.quantize(
+            money.to_decimal(item.quantity) * money.to_decimal(item.unit_price), currency
+        )
+        return f"Math error for {item.description}: {item.quantity}*{item.unit_price}={calculated} != {item.line_total}"
 
-   
-        for item in state.extracted_items:
-            calculated = item.quantity * item.unit_price
+    @classmethod
+    def find_math_errors(
+        cls, items: List[ExtractedLineItem], currency: Optional[str] = None
+    ) -> Dict[int, str]:
+        """
+        Maps the index of every line whose quantity * unit price != total to
+        its flag. Both sides are compared in exact minor units of `currency`.
+        """
+        errors = {}
+        for i, item in enumerate(items):
        
-            if abs(calculated - item.line_total) > 0.01:
-                state.math_verification_passed = False
-                state.verification_flags.append(
-                    f"Math error for {item.description}: {item.quantity}*{item.unit_price}={calculated} != {item.line_total}"
-                )
+            error = money.line_total_error(item.quantity, item.unit_price, item.line_total, currency)
+            if error > LINE_TOLERANCE_MINOR_UNITS:
+                errors[i] = cls._math_error_flag(item, currency)
+        return errors
 
-        return state
+    @classmethod
+    def check_line_math(
+        cls, items: List[ExtractedLineItem], currency: Optional[str] = None
+    ) -> List[str]:
+        """Returns one flag per line whose quantity * unit price != total."""
+        return list(cls.find_math_errors(items, currency).values())
@@ -0,0 +1,72 @@
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from src.core import money
+from src.core.state import ExtractedLineItem
+
+# Largest accepted gap, in minor currency units, between quantity * unit
+# price and the line total once both are rounded to the currency.
+LINE_TOLERANCE_MINOR_UNITS = 1
+# Relative unit-price increase over the PO that is flagged, and the one
+# that makes the flag high severity.
+PRICE_VARIANCE_TOLERANCE = 0.05
+HIGH_PRICE_VARIANCE = 0.15
+
+
+class LineItemColumns:
+    """
+    Line items of many invoices as flat NumPy columns.
+
+    Row r belongs to invoice `invoice[r]` and is line `line[r]` of it;
+    invoice k owns rows `offsets[k]:offsets[k + 1]`. Building the columns
+    is the only per-item Python work, every check after that is a single
+    array expression over all invoices.
+    """
+
+    def __init__(
+        self,
+        item_lists: Sequence[Sequence[ExtractedLineItem]],
+        currencies: Optional[Sequence[Optional[str]]] = None,
+    ):
+        counts = np.fromiter((len(items) for items in item_lists), dtype=np.int64, count=len(item_lists))
+        self.offsets = np.concatenate(([0], np.cumsum(counts)))
+        self.invoice = np.repeat(np.arange(len(item_lists)), counts)
+        self.line = np.arange(self.offsets[-1]) - self.offsets[self.invoice]
+
+        n = int(self.offsets[-1])
+        flat = [item for items in item_lists for item in items]
+        self.quantity = np.fromiter((item.quantity for item in flat), dtype=np.float64, count=n)
+        self.unit_price = np.fromiter((item.unit_price for item in flat), dtype=np.float64, count=n)
+        self.line_total = np.fromiter((item.line_total for item in flat), dtype=np.float64, count=n)
+        # Minor-unit exponent of each row's invoice currency.
+        self.exponent = money.exponents_for(currencies or [None] * len(item_lists))[self.invoice]
+
+    def __len__(self) -> int:
+        return len(self.quantity)
+
+
+def math_error_mask(
+    columns: LineItemColumns, tolerance: int = LINE_TOLERANCE_MINOR_UNITS
+) -> np.ndarray:
+    """True for every row whose quantity * unit price differs from its total."""
+    errors = money.line_total_errors(
+        columns.quantity, columns.unit_price, columns.line_total, columns.exponent
+    )
+    return errors > tolerance
+
+
+def price_flags(invoice_prices: np.ndarray, po_prices: np.ndarray):
+    """
+    Unit-price variance against the PO, which rows exceed the tolerance
+    and which of those are high severity. Thresholds are compared exactly,
+    so a price exactly at the tolerance is never flagged by float error.
+    """
+    variance = money.price_variance_array(invoice_prices, po_prices)
+    flagged = money.exceeds_ratio_array(invoice_prices, po_prices, PRICE_VARIANCE_TOLERANCE)
+    high = money.exceeds_ratio_array(invoice_prices, po_prices, HIGH_PRICE_VARIANCE)
+    return variance, flagged, high
+
+
+def flagged_rows(mask: np.ndarray) -> List[int]:
+    return np.flatnonzero(mask).tolist()
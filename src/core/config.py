@@ -0,0 +1,64 @@
+import os
+
+# --- Data sources ---
+PO_DB_PATH = os.getenv("SAFEPAY_PO_DB_PATH", "data/purchase_orders.json")
+VECTOR_DB_PATH = os.getenv("SAFEPAY_VECTOR_DB_PATH", "vectorstore/db_faiss")
+
+# --- Models ---
+EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+LLM_MODEL_NAME = os.getenv("SAFEPAY_LLM_MODEL", "gemini-2.5-flash-lite")
+# "gemini" calls the API; "fake" serves recorded or generated extractions
+# offline (see src/core/fake_llm.py) for load tests.
+LLM_BACKEND = os.getenv("SAFEPAY_LLM_BACKEND", "gemini")
+LLM_MAX_OUTPUT_TOKENS = 4096
+# Bind the extraction schema as the response schema (native JSON mode)
+# instead of describing the JSON format in the prompt.
+LLM_STRUCTURED_OUTPUT = os.getenv("SAFEPAY_STRUCTURED_OUTPUT", "1").lower() not in ("0", "false", "no")
+
+# --- Graph checkpoints (resume interrupted invoices) ---
+CHECKPOINT_DB_PATH = os.getenv("SAFEPAY_CHECKPOINT_DB", ".cache/checkpoints.sqlite")
+
+# --- Extraction cache ---
+EXTRACTION_CACHE_DIR = os.getenv("SAFEPAY_EXTRACTION_CACHE_DIR", ".cache/extractions")
+EXTRACTION_CACHE_TTL_SECONDS = 30 * 24 * 3600
+EXTRACTION_CACHE_MAX_BYTES = 512 * 1024 * 1024
+BYPASS_EXTRACTION_CACHE = os.getenv("SAFEPAY_BYPASS_CACHE", "").lower() in ("1", "true", "yes")
+
+# --- LLM quota ---
+LLM_REQUESTS_PER_MINUTE = float(os.getenv("SAFEPAY_LLM_RPM", "15"))
+LLM_TOKENS_PER_MINUTE = float(os.getenv("SAFEPAY_LLM_TPM", "250000"))
+LLM_ESTIMATED_TOKENS_PER_REQUEST = 3000
+# Token budgeting: Gemini bills ~258 input tokens per PDF page; output is
+# sized from the pages (or, when known, the line items) being read.
+LLM_INPUT_TOKENS_PER_PAGE = 258
+LLM_PROMPT_TOKENS = 200
+LLM_OUTPUT_TOKENS_BASE = 256
+LLM_OUTPUT_TOKENS_PER_PAGE = 1024
+LLM_OUTPUT_TOKENS_PER_LINE = 96
+LLM_MIN_OUTPUT_TOKENS = 512
+LLM_MAX_RETRIES = 6
+LLM_BACKOFF_BASE_SECONDS = 2.0
+LLM_BACKOFF_CAP_SECONDS = 120.0
+
+# --- Offline fake LLM backend ---
+FAKE_LLM_RECORDINGS_DIR = os.getenv("SAFEPAY_FAKE_LLM_RECORDINGS", "data/fake_llm")
+FAKE_LLM_LATENCY_MS = float(os.getenv("SAFEPAY_FAKE_LLM_LATENCY_MS", "800"))
+FAKE_LLM_429_RATE = float(os.getenv("SAFEPAY_FAKE_LLM_429_RATE", "0"))
+FAKE_LLM_ERROR_RATE = float(os.getenv("SAFEPAY_FAKE_LLM_ERROR_RATE", "0"))
+# Server-side quota the fake enforces with 429s (0 = unlimited).
+FAKE_LLM_REQUESTS_PER_MINUTE = float(os.getenv("SAFEPAY_FAKE_LLM_RPM", "0"))
+
+# --- Vector search ---
+EMBEDDING_BATCH_SIZE = 64
+VECTOR_INDEX_TYPE = os.getenv("SAFEPAY_VECTOR_INDEX", "flat")
+VECTOR_COMPRESSION = os.getenv("SAFEPAY_VECTOR_COMPRESSION", "none")
+
+# --- Extraction tiers ---
+TEXT_LAYER_EXTRACTION = os.getenv("SAFEPAY_TEXT_LAYER", "1").lower() not in ("0", "false", "no")
+EXTRACTION_PAGES_PER_CHUNK = 4
+EXTRACTION_PAGE_WORKERS = 4
+
+# --- PDF ingestion ---
+# Memory each worker may spend on in-flight PDF payloads. Larger documents
+# are streamed to the Gemini Files API instead of being sent inline.
+PDF_WORKER_MEMORY_CEILING_BYTES = int(os.getenv("SAFEPAY_WORKER_MEMORY_MB", "64")) * 1024 * 1024
@@ -1,30 +1,67 @@
 import json
 import os
 from typing import List, Dict, Optional, Tuple
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_community.vectorstores import FAISS
-from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from src.core import config
+from src.core.hashing import file_sha256, text_sha256
+from src.core.supplier_index import SupplierIndex
+from src.core.vector_index import (
+    build_index,
+    configure_search,
+    requires_training,
+    supports_removal,
+)
+
+MANIFEST_FILENAME = "manifest.json"
+MANIFEST_VERSION = 3
+# Float32 embeddings, one row per PO in manifest `po_hashes` order, so
+# indexes that must be rebuilt never re-embed unchanged POs.
+VECTORS_FILENAME = "vectors.npy"
+
+# L2 distance above which a vector hit is not considered a candidate.
+MAX_FUZZY_DISTANCE = 1.5
 
 
 class PurchaseOrderDatabase:
-    def __init__(self, json_path: str, vector_db_path: str = "vectorstore/db_faiss"):
+    def __init__(
+        self,
+        json_path: str,
+        vector_db_path: str = config.VECTOR_DB_PATH,
+        embeddings: Optional[Embeddings] = None,
+        index_type: str = config.VECTOR_INDEX_TYPE,
+        compression: str = config.VECTOR_COMPRESSION,
+    ):
         """
         Initializes the PO Database.
 
         Args:
             json_path: Path to the raw purchase_orders.json
             vector_db_path: Directory where the FAISS index should be saved/loaded
+            embeddings: Shared embedding model. Loaded on demand when omitted;
+                pass the registry's instance to avoid a second model load.
+            index_type: "flat" (exact), "ivfpq" or "hnsw" (approximate)
+            compression: "none", "float16" or "int8" vector storage for the
+                flat and HNSW index types
         """
         self.json_path = json_path
         self.vector_db_path = vector_db_path
+        self.index_type = index_type
+        self.compression = compression
 
     
-        self.embeddings = HuggingFaceEmbeddings(
-            model_name="sentence-transformers/all-MiniLM-L6-v2"
-        )
+        if embeddings is None:
+            from langchain_huggingface import HuggingFaceEmbeddings
+
+            embeddings = HuggingFaceEmbeddings(model_name=config.EMBEDDING_MODEL_NAME)
+        self.embeddings = embeddings
 
      
         self.data = self._load_raw_json(json_path)
+        self.supplier_index = SupplierIndex(self.data)
 
     
         self.vector_store = self._initialize_vector_store()
@@ -38,40 +75,207 @@ class PurchaseOrderDatabase:
 
         return {po["po_number"]: po for po in raw_data["purchase_orders"]}
 
+    @property
+    def _manifest_path(self) -> str:
+        return os.path.join(self.vector_db_path, MANIFEST_FILENAME)
+
+    @property
+    def _vectors_path(self) -> str:
+        return os.path.join(self.vector_db_path, VECTORS_FILENAME)
+
+    def _load_manifest(self) -> Optional[Dict]:
+        try:
+            with open(self._manifest_path, "r") as f:
+                manifest = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        if manifest.get("version") != MANIFEST_VERSION:
+            return None
+        return manifest
+
+    def _save_manifest(self, source_sha256: str, po_hashes: Dict[str, str]):
+        with open(self._manifest_path, "w") as f:
+            json.dump(
+                {
+                    "version": MANIFEST_VERSION,
+                    "embedding_model": self._embedding_model_name(),
+                    "index_type": self.index_type,
+                    "compression": self.compression,
+                    "source_sha256": source_sha256,
+                    "po_hashes": po_hashes,
+                },
+                f,
+            )
+
+    def _embedding_model_name(self) -> str:
+        return getattr(self.embeddings, "model_name", type(self.embeddings).__name__)
+
     def _initialize_vector_store(self) -> FAISS:
         """
         Implements the logic to connect to memory (load) or create memory (save).
+
+        The index directory carries a manifest with the source file hash and a
+        content hash per PO. An unchanged source loads as-is; a changed one
+        only re-embeds the POs that were added or edited and drops removed
+        ones. Indexes without a matching manifest are rebuilt from scratch.
         """
-    
-        if os.path.exists(self.vector_db_path):
+        source_sha256 = file_sha256(self.json_path)
+        manifest = self._load_manifest()
+
+        if (
+            os.path.exists(self.vector_db_path)
+            and manifest
+            and manifest["embedding_model"] == self._embedding_model_name()
+            and manifest["index_type"] == self.index_type
+            and manifest["compression"] == self.compression
+            and os.path.exists(self._vectors_path)
+        ):
             print(f"Loading existing vector store from {self.vector_db_path}...")
           
-            return FAISS.load_local(
+            db = FAISS.load_local(
                 self.vector_db_path,
                 self.embeddings,
                 allow_dangerous_deserialization=True,
             )
+            configure_search(db.index)
+            if manifest["source_sha256"] != source_sha256:
+                return self._refresh_index(db, manifest["po_hashes"], source_sha256)
+            return db
         else:
             print("Creating new vector store and saving to disk...")
           
-            return self._build_and_save_index()
+            return self._build_and_save_index(source_sha256)
 
-    def _build_and_save_index(self) -> FAISS:
-        documents = []
+    def _po_documents(self) -> Dict[str, Document]:
+        documents = {}
         for po_id, data in self.data.items():
      
             items_str = ", ".join([item["description"] for item in data["line_items"]])
             content = f"Supplier: {data['supplier']}. Items: {items_str}"
 
-            doc = Document(page_content=content, metadata={"po_number": po_id})
-            documents.append(doc)
+            documents[po_id] = Document(page_content=content, metadata={"po_number": po_id})
+        return documents
+
+    def _build_and_save_index(
+        self, source_sha256: str, vectors: Optional[np.ndarray] = None
+    ) -> FAISS:
+        """
+        Builds the index from `vectors` (rows in catalog order), embedding
+        the whole catalog only when they are not given.
+        """
+        documents = self._po_documents()
+
+        ids = list(documents.keys())
+        if vectors is None:
+            vectors = self.embed_texts([doc.page_content for doc in documents.values()])
 
      
-        db = FAISS.from_documents(documents, self.embeddings)
+        db = FAISS(
+            embedding_function=self.embeddings,
+            index=build_index(vectors, self.index_type, self.compression),
+            docstore=InMemoryDocstore(documents),
+            index_to_docstore_id=dict(enumerate(ids)),
+        )
 
         db.save_local(self.vector_db_path)
+        np.save(self._vectors_path, vectors)
+        self._save_manifest(
+            source_sha256,
+            {po_id: text_sha256(doc.page_content) for po_id, doc in documents.items()},
+        )
         return db
 
+    def _refresh_index(
+        self, db: FAISS, indexed_hashes: Dict[str, str], source_sha256: str
+    ) -> FAISS:
+        """
+        Upserts added/changed POs and deletes removed ones in place. Indexes
+        trained on their vectors (int8, IVF-PQ) are rebuilt on any change so
+        the quantizer fits the current catalog. Indexes that cannot remove
+        vectors (HNSW) are rebuilt when POs change or disappear, and only
+        appended to when POs are added. Either way only added and changed
+        POs are embedded; rebuilds reuse the stored vectors of the rest.
+        """
+        documents = self._po_documents()
+        current_hashes = {
+            po_id: text_sha256(doc.page_content) for po_id, doc in documents.items()
+        }
+
+        removed = [po_id for po_id in indexed_hashes if po_id not in current_hashes]
+        changed = [
+            po_id
+            for po_id, digest in current_hashes.items()
+            if po_id in indexed_hashes and indexed_hashes[po_id] != digest
+        ]
+        added = [po_id for po_id in current_hashes if po_id not in indexed_hashes]
+
+        print(
+            f"PO source changed: +{len(added)} ~{len(changed)} -{len(removed)}. "
+            "Refreshing vector store..."
+        )
+
+        upserts = changed + added
+        fresh = self.embed_texts([documents[po_id].page_content for po_id in upserts])
+        vectors = self._merge_vectors(indexed_hashes, current_hashes, upserts, fresh)
+
+        trained = requires_training(
+            self.index_type, db.index.d, len(current_hashes), self.compression
+        )
+        if trained or ((removed or changed) and not supports_removal(db.index)):
+            return self._build_and_save_index(source_sha256, vectors)
+
+        if removed or changed:
+            db.delete(removed + changed)
+        if upserts:
+            docs = [documents[po_id] for po_id in upserts]
+            db.add_embeddings(
+                list(zip([doc.page_content for doc in docs], fresh.tolist())),
+                metadatas=[doc.metadata for doc in docs],
+                ids=upserts,
+            )
+
+        db.save_local(self.vector_db_path)
+        np.save(self._vectors_path, vectors)
+        self._save_manifest(source_sha256, current_hashes)
+        return db
+
+    def _merge_vectors(
+        self,
+        indexed_hashes: Dict[str, str],
+        current_hashes: Dict[str, str],
+        upserts: List[str],
+        fresh: np.ndarray,
+    ) -> np.ndarray:
+        """
+        Vectors of the current catalog, in its order: stored rows for
+        unchanged POs and the freshly embedded ones for `upserts`.
+        """
+        stored = np.load(self._vectors_path, mmap_mode="r")
+        stored_row = {po_id: row for row, po_id in enumerate(indexed_hashes)}
+        source_rows = np.fromiter(
+            (stored_row.get(po_id, 0) for po_id in current_hashes),
+            dtype=np.int64,
+            count=len(current_hashes),
+        )
+        vectors = np.array(stored[source_rows], dtype=np.float32)
+
+        position = {po_id: row for row, po_id in enumerate(current_hashes)}
+        for fresh_row, po_id in enumerate(upserts):
+            vectors[position[po_id]] = fresh[fresh_row]
+        return vectors
+
+    def embed_texts(
+        self, texts: List[str], batch_size: int = config.EMBEDDING_BATCH_SIZE
+    ) -> np.ndarray:
+        """
+        Embeds texts in batches of `batch_size`, each batch being a single
+        model forward pass. Returns a (len(texts), dim) float32 matrix.
+        """
+        vectors = []
+        for start in range(0, len(texts), batch_size):
+            vectors.extend(self.embeddings.embed_documents(texts[start : start + batch_size]))
+        return np.asarray(vectors, dtype=np.float32)
+
     def get_exact_match(self, po_number: str) -> Optional[Dict]:
         return self.data.get(po_number)
 
@@ -79,12 +283,35 @@ class PurchaseOrderDatabase:
         self, query: str, threshold: float = 0.6
     ) -> List[Tuple[str, float]]:
    
-        results = self.vector_store.similarity_search_with_score(query, k=3)
+        return self.search_fuzzy_batch([query])[0]
+
+    def search_fuzzy_batch(
+        self,
+        queries: List[str],
+        k: int = 3,
+        batch_size: int = config.EMBEDDING_BATCH_SIZE,
+    ) -> List[List[Tuple[str, float]]]:
+        """
+        Vector search for many queries at once: all queries are embedded in
+        batches and FAISS is searched with one matrix query. Returns the
+        (po_number, distance) candidates for each query, in query order.
+        """
+        if not queries:
+            return []
+
+        vectors = self.embed_texts(queries, batch_size=batch_size)
+        distances, indices = self.vector_store.index.search(vectors, k)
 
-        candidates = []
-        for doc, score in results:
-        
-            if score < 1.5:
+        index_to_id = self.vector_store.index_to_docstore_id
+        results = []
+        for row_distances, row_indices in zip(distances, indices):
+            candidates = []
+            for score, idx in zip(row_distances, row_indices):
+                # FAISS pads with -1 when the index holds fewer than k vectors.
+                if idx == -1 or score >= MAX_FUZZY_DISTANCE:
+                    continue
+                doc = self.vector_store.docstore.search(index_to_id[idx])
                 candidates.append((doc.metadata["po_number"], float(score)))
+            results.append(candidates)
 
-        return candidates
+        return results
@@ -0,0 +1,129 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from src.core import config
+
+
+class ExtractionCache:
+    """
+    Content-addressed, on-disk cache of parsed LLM extractions.
+
+    Entries are keyed by the PDF's SHA-256 together with the model name and
+    prompt version, so renamed or duplicate files hit the same entry while a
+    model or prompt change naturally invalidates it. Entries expire after
+    `ttl_seconds`, and the least recently used ones are evicted once the
+    directory grows past `max_bytes`.
+    """
+
+    # Eviction walks the whole cache directory, so it runs periodically
+    # rather than on every write.
+    EVICT_EVERY_N_PUTS = 100
+
+    def __init__(
+        self,
+        cache_dir: str = config.EXTRACTION_CACHE_DIR,
+        ttl_seconds: float = config.EXTRACTION_CACHE_TTL_SECONDS,
+        max_bytes: int = config.EXTRACTION_CACHE_MAX_BYTES,
+    ):
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._puts_since_evict = self.EVICT_EVERY_N_PUTS
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(pdf_sha256: str, model_name: str, prompt_version: str) -> str:
+        return hashlib.sha256(
+            f"{pdf_sha256}|{model_name}|{prompt_version}".encode("utf-8")
+        ).hexdigest()
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self._entry_path(key)
+        try:
+            with open(path, "r") as f:
+                entry = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        if time.time() - entry.get("created_at", 0) > self.ttl_seconds:
+            self._remove(path)
+            with self._lock:
+                self.misses += 1
+            return None
+
+        # Record the read in the access time so size-based eviction drops the
+        # coldest files first. The mtime stays the creation time, which is
+        # what eviction checks the TTL against.
+        try:
+            os.utime(path, (time.time(), os.stat(path).st_mtime))
+        except FileNotFoundError:
+            pass  # evicted by another worker since we read it
+        with self._lock:
+            self.hits += 1
+        return entry["data"]
+
+    def put(self, key: str, data: Dict[str, Any]):
+        path = self._entry_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump({"created_at": time.time(), "data": data}, f)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._puts_since_evict += 1
+            due = self._puts_since_evict >= self.EVICT_EVERY_N_PUTS
+        if due:
+            self.evict()
+
+    def evict(self):
+        """
+        Drops expired entries, then the least recently read ones until under
+        max_bytes. Works from file metadata alone: mtime is when the entry
+        was written and atime when it was last read.
+        """
+        with self._lock:
+            self._puts_since_evict = 0
+            entries = []
+            now = time.time()
+            for root, _, files in os.walk(self.cache_dir):
+                for name in files:
+                    if not name.endswith(".json"):
+                        continue
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    if now - stat.st_mtime > self.ttl_seconds:
+                        self._remove(path)
+                        continue
+                    entries.append((stat.st_atime, stat.st_size, path))
+
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                self._remove(path)
+                total -= size
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,307 @@
+import argparse
+import base64
+import collections
+import hashlib
+import io
+import json
+import os
+import random
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import PrivateAttr
+
+from src.core import config
+from src.core.hashing import file_sha256
+from src.core.pdf_payload import SOURCE_DOCUMENT_KEY, SOURCE_PAGES_KEY
+
+# Rough Gemini accounting, so usage_metadata drives the rate limiter the
+# same way real responses do.
+CHARS_PER_TOKEN = 4
+
+_REPAIR_LINE_RE = re.compile(
+    r"- index (\d+): (.*?) \| quantity=([\d.]+) unit_price=([\d.]+) line_total=([\d.]+)"
+)
+
+
+class FakeExtractionLLM(BaseChatModel):
+    """
+    Offline stand-in for the Gemini chat model, for load tests without
+    network access.
+
+    It answers the Document Intelligence Agent's calls with the payload for
+    the attached PDF: a recording (`<sha256 of the PDF bytes>.json` in
+    `recordings_dir`) when there is one, otherwise an invoice generated
+    deterministically from a PO in the catalog. A page chunk is answered
+    from its source document, with the share of the items that falls on
+    its pages, so every chunk of one invoice agrees. The reply follows the
+    response schema bound for the call (full extraction, continuation
+    chunk or line repair) and honours max_output_tokens by truncating.
+
+    Latency, random 429s and random errors are injected at the configured
+    rates, and `requests_per_minute` emulates the server-side quota so
+    backpressure and backoff can be exercised end to end.
+    """
+
+    model: str = "fake-extractor"
+    recordings_dir: Optional[str] = config.FAKE_LLM_RECORDINGS_DIR
+    po_db_path: str = config.PO_DB_PATH
+    latency_ms: float = config.FAKE_LLM_LATENCY_MS
+    latency_jitter: float = 0.3
+    rate_limit_rate: float = config.FAKE_LLM_429_RATE
+    error_rate: float = config.FAKE_LLM_ERROR_RATE
+    requests_per_minute: float = config.FAKE_LLM_REQUESTS_PER_MINUTE
+    seed: Optional[int] = None
+
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    _recent: collections.deque = PrivateAttr(default_factory=collections.deque)
+    _rng: random.Random = PrivateAttr(default=None)
+    _purchase_orders: Optional[List[Dict[str, Any]]] = PrivateAttr(default=None)
+
+    def model_post_init(self, __context: Any):
+        self._rng = random.Random(self.seed)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-extraction"
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager=None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        self._admit()
+        if self.latency_ms:
+            jitter = self._uniform(1 - self.latency_jitter, 1 + self.latency_jitter)
+            time.sleep(self.latency_ms * jitter / 1000.0)
+
+        prompt, pdf_bytes = self._split_content(messages[-1])
+        schema = (kwargs.get("response_json_schema") or {}).get("title", "InvoiceExtraction")
+        payload = self._payload_for(pdf_bytes, prompt, schema)
+
+        text = json.dumps(payload)
+        max_output_tokens = kwargs.get("max_output_tokens") or config.LLM_MAX_OUTPUT_TOKENS
+        finish_reason = "STOP"
+        if len(text) > max_output_tokens * CHARS_PER_TOKEN:
+            text = text[: max_output_tokens * CHARS_PER_TOKEN]
+            finish_reason = "MAX_TOKENS"
+
+        input_tokens = len(prompt) // CHARS_PER_TOKEN + config.LLM_INPUT_TOKENS_PER_PAGE * max(
+            self._read_pdf(pdf_bytes)[0], 1
+        )
+        output_tokens = len(text) // CHARS_PER_TOKEN
+        message = AIMessage(
+            content=text,
+            response_metadata={"finish_reason": finish_reason, "model_name": self.model},
+            usage_metadata={
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+                "total_tokens": input_tokens + output_tokens,
+            },
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _uniform(self, low: float, high: float) -> float:
+        with self._lock:
+            return self._rng.uniform(low, high)
+
+    def _admit(self):
+        """Raises the errors a real endpoint would: quota 429s and failures."""
+        with self._lock:
+            roll = self._rng.random()
+            now = time.monotonic()
+            if self.requests_per_minute:
+                while self._recent and now - self._recent[0] > 60.0:
+                    self._recent.popleft()
+                if len(self._recent) >= self.requests_per_minute:
+                    retry_in = 60.0 - (now - self._recent[0])
+                    raise RuntimeError(
+                        f"429 RESOURCE_EXHAUSTED: fake quota of {self.requests_per_minute:g} "
+                        f"requests/minute exceeded. Please retry in {retry_in:.1f}s."
+                    )
+                self._recent.append(now)
+
+        if roll < self.rate_limit_rate:
+            raise RuntimeError("429 RESOURCE_EXHAUSTED: injected rate limit. Please retry in 1s.")
+        if roll < self.rate_limit_rate + self.error_rate:
+            raise RuntimeError("500 INTERNAL: injected backend error.")
+
+    @staticmethod
+    def _split_content(message: BaseMessage):
+        """Returns (prompt text, PDF bytes) from a text + data-URL/file message."""
+        if isinstance(message.content, str):
+            return message.content, b""
+        prompt, pdf_bytes = [], b""
+        for part in message.content:
+            if part.get("type") == "text":
+                prompt.append(part["text"])
+            elif part.get("type") == "image_url":
+                url = part["image_url"]["url"]
+                pdf_bytes = base64.b64decode(url.split(",", 1)[1])
+            elif part.get("type") == "media":
+                pdf_bytes = part.get("file_uri", "").encode()
+        return "\n".join(prompt), pdf_bytes
+
+    @staticmethod
+    def _read_pdf(pdf_bytes: bytes):
+        """
+        Returns (page count, source document sha256, source page span) for
+        the attached PDF. The source is the PDF itself unless it is a page
+        chunk stamped by the Document Intelligence Agent; the span is then
+        the chunk's 0-based [first, last) pages out of the source's total.
+        """
+        digest = hashlib.sha256(pdf_bytes).hexdigest()
+        try:
+            from pypdf import PdfReader
+
+            reader = PdfReader(io.BytesIO(pdf_bytes))
+            page_count = len(reader.pages)
+            info = reader.metadata or {}
+        except Exception:
+            return 1, digest, None
+
+        span = None
+        pages = re.fullmatch(r"(\d+)-(\d+)/(\d+)", str(info.get(SOURCE_PAGES_KEY, "")))
+        if info.get(SOURCE_DOCUMENT_KEY) and pages:
+            digest = str(info[SOURCE_DOCUMENT_KEY])
+            first, last, total = (int(n) for n in pages.groups())
+            span = (first - 1, last, total)
+        return page_count, digest, span
+
+    def _payload_for(self, pdf_bytes: bytes, prompt: str, schema: str) -> Dict[str, Any]:
+        if schema == "LineItemRepair" or _REPAIR_LINE_RE.search(prompt):
+            return {
+                "items": [
+                    {
+                        "index": int(index),
+                        "description": description,
+                        "quantity": float(quantity),
+                        "unit_price": float(unit_price),
+                        "line_total": round(float(quantity) * float(unit_price), 2),
+                        "confidence": 0.95,
+                    }
+                    for index, description, quantity, unit_price, _ in _REPAIR_LINE_RE.findall(
+                        prompt
+                    )
+                ]
+            }
+
+        _, digest, span = self._read_pdf(pdf_bytes)
+        payload = self._recorded(digest) or self._generated(digest)
+        if span is not None:
+            first, last, total = span
+            items = payload.get("items", [])
+            payload = dict(
+                payload,
+                items=items[len(items) * first // total : len(items) * last // total],
+            )
+        if schema == "LineItemsExtraction":
+            return {
+                "items": payload.get("items", []),
+                "overall_confidence": payload.get("overall_confidence", 0.9),
+                "notes": payload.get("notes", ""),
+            }
+        return payload
+
+    def _recorded(self, digest: str) -> Optional[Dict[str, Any]]:
+        if not self.recordings_dir:
+            return None
+        path = os.path.join(self.recordings_dir, f"{digest}.json")
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _generated(self, digest: str) -> Dict[str, Any]:
+        """A clean invoice for the catalog PO picked by the PDF's hash."""
+        with self._lock:
+            if self._purchase_orders is None:
+                try:
+                    with open(self.po_db_path, "r") as f:
+                        self._purchase_orders = json.load(f)["purchase_orders"]
+                except (FileNotFoundError, KeyError, json.JSONDecodeError):
+                    self._purchase_orders = []
+
+        if not self._purchase_orders:
+            return {"items": [], "overall_confidence": 0.0, "notes": "No PO catalog to generate from."}
+
+        po = self._purchase_orders[int(digest[:12], 16) % len(self._purchase_orders)]
+        return {
+            "invoice_id": f"INV-{digest[:8].upper()}",
+            "supplier_name": po["supplier"],
+            "date": po.get("date"),
+            "po_reference": po["po_number"],
+            "currency": po.get("currency"),
+            "items": [
+                {
+                    "description": item["description"],
+                    "quantity": float(item["quantity"]),
+                    "unit_price": float(item["unit_price"]),
+                    "line_total": float(item["line_total"]),
+                    "confidence": 0.93,
+                }
+                for item in po["line_items"]
+            ],
+            "overall_confidence": 0.93,
+            "notes": "Generated by the offline fake backend.",
+        }
+
+
+def record_extraction(recordings_dir: str, pdf_path: str, payload: Dict[str, Any]) -> str:
+    """Saves `payload` as the fake backend's answer for `pdf_path`."""
+    os.makedirs(recordings_dir, exist_ok=True)
+    path = os.path.join(recordings_dir, f"{file_sha256(pdf_path)}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2)
+    return path
+
+
+def record_from_results(
+    records: List[Dict[str, Any]], invoices_dir: str, recordings_dir: str
+) -> int:
+    """Turns stored pipeline results into recordings for their source PDFs."""
+    recorded = 0
+    for record in records:
+        pdf_path = os.path.join(invoices_dir, record["source_file"])
+        if not os.path.exists(pdf_path):
+            continue
+        results = record["processing_results"]
+        extracted = results["extracted_data"]
+        record_extraction(
+            recordings_dir,
+            pdf_path,
+            {
+                "invoice_id": record.get("invoice_id"),
+                "supplier_name": extracted.get("supplier"),
+                "date": extracted.get("date"),
+                "po_reference": extracted.get("po_reference"),
+                "currency": extracted.get("currency"),
+                "items": extracted.get("line_items", []),
+                "overall_confidence": results.get("extraction_confidence", 0.0),
+                "notes": "Recorded from a previous run.",
+            },
+        )
+        recorded += 1
+    return recorded
+
+
+if __name__ == "__main__":
+    from src.core.results_store import ResultsStore
+
+    parser = argparse.ArgumentParser(
+        description="Record extractions from stored results for the fake LLM backend."
+    )
+    parser.add_argument("--invoices-dir", default="data/invoices")
+    parser.add_argument("--recordings-dir", default=config.FAKE_LLM_RECORDINGS_DIR)
+    args = parser.parse_args()
+
+    count = record_from_results(ResultsStore().load(), args.invoices_dir, args.recordings_dir)
+    print(f"🎙️ Recorded {count} extractions to {args.recordings_dir}")
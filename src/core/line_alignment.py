@@ -0,0 +1,64 @@
+from typing import Dict, List, NamedTuple, Sequence
+
+import numpy as np
+from rapidfuzz import fuzz, process
+
+# Minimum description similarity for an invoice line to count as a PO line.
+MATCH_THRESHOLD = 0.6
+
+
+class LineAlignment(NamedTuple):
+    # invoice line index -> (PO line index, similarity)
+    matches: Dict[int, tuple]
+    unmatched_invoice: List[int]
+    unmatched_po: List[int]
+
+
+def similarity_matrix(
+    invoice_descriptions: Sequence[str], po_descriptions: Sequence[str]
+) -> np.ndarray:
+    """
+    Case-insensitive normalized Indel similarity (0..1) of every invoice
+    line against every PO line, computed in one native pass.
+    """
+    return (
+        process.cdist(
+            [d.lower() for d in invoice_descriptions],
+            [d.lower() for d in po_descriptions],
+            scorer=fuzz.ratio,
+            dtype=np.float32,
+        )
+        / 100.0
+    )
+
+
+def align_line_items(
+    invoice_descriptions: Sequence[str],
+    po_descriptions: Sequence[str],
+    threshold: float = MATCH_THRESHOLD,
+) -> LineAlignment:
+    """
+    One-to-one assignment of invoice lines to PO lines maximising total
+    description similarity (Hungarian algorithm). Pairs at or below
+    `threshold` are never matched, so each PO line is claimed at most once
+    and lines without a plausible counterpart are reported as unmatched.
+    """
+    from scipy.optimize import linear_sum_assignment  # scipy is slow to import
+
+    n_invoice, n_po = len(invoice_descriptions), len(po_descriptions)
+    if not n_invoice or not n_po:
+        return LineAlignment({}, list(range(n_invoice)), list(range(n_po)))
+
+    sim = similarity_matrix(invoice_descriptions, po_descriptions)
+    eligible = np.where(sim > threshold, sim, 0.0)
+    rows, cols = linear_sum_assignment(eligible, maximize=True)
+
+    matches = {
+        int(r): (int(c), float(sim[r, c])) for r, c in zip(rows, cols) if eligible[r, c] > 0
+    }
+    matched_po = {c for c, _ in matches.values()}
+    return LineAlignment(
+        matches,
+        [i for i in range(n_invoice) if i not in matches],
+        [j for j in range(n_po) if j not in matched_po],
+    )
@@ -0,0 +1,183 @@
+import sys
+import threading
+import time
+from collections import defaultdict
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+OPENMETRICS_CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def peak_rss_bytes() -> int:
+    """Peak resident set size of the process so far (ru_maxrss is KiB on Linux)."""
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class MetricsRegistry:
+    """
+    Thread-safe collector for per-node samples across a run.
+
+    Each sample holds wall and CPU seconds, LLM tokens and rate-limit
+    waits, the growth of the process's peak RSS while the node ran and,
+    for extraction, whether the cache answered. Durations are kept raw so
+    p50/p95/p99 can be computed at any point; everything else is summed.
+    `resource_loads` returns construction times of shared resources
+    (embedding model, FAISS index, LLM client) for export alongside.
+    """
+
+    def __init__(self, resource_loads: Optional[Callable[[], Dict[str, float]]] = None):
+        self._lock = threading.Lock()
+        self._durations: Dict[str, List[float]] = defaultdict(list)
+        self._totals: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        self._resource_loads = resource_loads or dict
+
+    def observe(self, node: str, sample: Dict[str, float]):
+        with self._lock:
+            self._durations[node].append(sample["wall_ms"] / 1000.0)
+            totals = self._totals[node]
+            totals["cpu_seconds"] += sample["cpu_ms"] / 1000.0
+            totals["llm_input_tokens"] += sample.get("llm_input_tokens", 0)
+            totals["llm_output_tokens"] += sample.get("llm_output_tokens", 0)
+            totals["llm_wait_seconds"] += sample.get("llm_wait_seconds", 0.0)
+            totals["rss_growth_bytes"] += sample.get("peak_rss_delta_bytes", 0)
+            if sample.get("cache_hit"):
+                totals["cache_hits"] += 1
+
+    def percentiles(self) -> Dict[str, Dict[str, float]]:
+        """{node: {"count", "p50", "p95", "p99"}} with durations in seconds."""
+        with self._lock:
+            durations = {node: list(values) for node, values in self._durations.items()}
+
+        summary = {}
+        for node, values in durations.items():
+            points = np.percentile(values, [q * 100 for q in QUANTILES])
+            summary[node] = {
+                "count": len(values),
+                **{f"p{int(q * 100)}": float(p) for q, p in zip(QUANTILES, points)},
+            }
+        return summary
+
+    def to_openmetrics(self) -> str:
+        """Renders the collected metrics in the OpenMetrics text format."""
+        quantiles = self.percentiles()
+        with self._lock:
+            sums = {node: sum(values) for node, values in self._durations.items()}
+            totals = {node: dict(values) for node, values in self._totals.items()}
+        loads = self._resource_loads()
+
+        lines = [
+            "# TYPE safepay_node_duration_seconds summary",
+            "# UNIT safepay_node_duration_seconds seconds",
+            "# HELP safepay_node_duration_seconds Wall time per graph node.",
+        ]
+        for node, stats in sorted(quantiles.items()):
+            for q in QUANTILES:
+                lines.append(
+                    f'safepay_node_duration_seconds{{node="{node}",quantile="{q}"}} '
+                    f"{stats[f'p{int(q * 100)}']:.6f}"
+                )
+            lines.append(f'safepay_node_duration_seconds_sum{{node="{node}"}} {sums[node]:.6f}')
+            lines.append(f'safepay_node_duration_seconds_count{{node="{node}"}} {stats["count"]}')
+
+        counters = [
+            ("safepay_node_cpu_seconds", "cpu_seconds", "CPU time per graph node."),
+            ("safepay_llm_input_tokens", "llm_input_tokens", "LLM prompt tokens."),
+            ("safepay_llm_output_tokens", "llm_output_tokens", "LLM completion tokens."),
+            ("safepay_llm_wait_seconds", "llm_wait_seconds", "Time spent waiting on the LLM quota."),
+            ("safepay_peak_rss_growth_bytes", "rss_growth_bytes", "Growth of peak RSS while the node ran."),
+            ("safepay_extraction_cache_hits", "cache_hits", "Extractions served from the cache."),
+        ]
+        for name, key, help_text in counters:
+            lines.append(f"# TYPE {name} counter")
+            lines.append(f"# HELP {name} {help_text}")
+            for node, values in sorted(totals.items()):
+                lines.append(f'{name}_total{{node="{node}"}} {values.get(key, 0):g}')
+
+        lines.append("# TYPE safepay_resource_load_seconds gauge")
+        lines.append("# HELP safepay_resource_load_seconds Time to construct each shared resource.")
+        for key, seconds in sorted(loads.items()):
+            lines.append(f'safepay_resource_load_seconds{{resource="{key}"}} {seconds:.6f}')
+
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.to_openmetrics())
+
+    def serve(self, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """Serves /metrics for a Prometheus scraper from a daemon thread."""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.to_openmetrics().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", OPENMETRICS_CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+def instrument(name: str, node: Callable, metrics: Optional[MetricsRegistry]) -> Callable:
+    """
+    Wraps a graph node so each call records wall/CPU time, LLM tokens and
+    waits, and peak RSS growth. The sample is attached as "metrics" to the
+    trace entry the node appended and reported to `metrics`.
+
+    CPU time is the calling thread's, so work the node fans out to other
+    threads (parallel page chunks) is not included. Peak RSS is
+    process-wide, so with several workers the delta is an upper bound for
+    the node.
+    """
+
+    @wraps(node)
+    def wrapper(state, *args, **kwargs):
+        trace_len = len(state.agent_trace)
+        tokens_in, tokens_out = state.llm_input_tokens, state.llm_output_tokens
+        waited = state.llm_wait_seconds
+        rss_before = peak_rss_bytes()
+        wall_start, cpu_start = time.perf_counter(), time.thread_time()
+
+        new_state = node(state, *args, **kwargs)
+
+        sample = {
+            "wall_ms": round((time.perf_counter() - wall_start) * 1000, 3),
+            "cpu_ms": round((time.thread_time() - cpu_start) * 1000, 3),
+            "llm_input_tokens": new_state.llm_input_tokens - tokens_in,
+            "llm_output_tokens": new_state.llm_output_tokens - tokens_out,
+            "llm_wait_seconds": round(new_state.llm_wait_seconds - waited, 3),
+            "peak_rss_delta_bytes": peak_rss_bytes() - rss_before,
+        }
+        if name == "extract":
+            sample["cache_hit"] = new_state.extraction_cache_hit
+
+        if len(new_state.agent_trace) > trace_len:
+            new_state.agent_trace[-1]["metrics"] = sample
+        if metrics is not None:
+            metrics.observe(name, sample)
+        return new_state
+
+    return wrapper
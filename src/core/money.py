@@ -0,0 +1,170 @@
+import math
+from decimal import ROUND_HALF_UP, Decimal
+from fractions import Fraction
+from typing import Optional, Sequence, Union
+
+import numpy as np
+
+Number = Union[int, float, str, Decimal]
+
+# ISO 4217 minor-unit exponents that differ from the usual 2.
+CURRENCY_EXPONENTS = {
+    **dict.fromkeys(
+        ["BIF", "CLP", "DJF", "GNF", "ISK", "JPY", "KMF", "KRW", "PYG", "RWF",
+         "UGX", "UYI", "VND", "VUV", "XAF", "XOF", "XPF"],
+        0,
+    ),
+    **dict.fromkeys(["BHD", "IQD", "JOD", "KWD", "LYD", "OMR", "TND"], 3),
+    **dict.fromkeys(["CLF", "UYW"], 4),
+}
+DEFAULT_EXPONENT = 2
+
+# Decimal places the array fast path holds exactly. Quantities and prices
+# with more places, or products too large for int64 at this scale, are
+# settled with Decimal instead.
+QTY_DECIMALS = 3
+PRICE_DECIMALS = 6
+PRODUCT_DECIMALS = QTY_DECIMALS + PRICE_DECIMALS
+# Keeps quantity * price * 10**PRODUCT_DECIMALS inside int64.
+FAST_PATH_MAX_PRODUCT = 1e9
+# Floats are exact integers below 2**52, so scaled values must stay under it.
+MAX_SCALED = 2.0**52
+
+
+def minor_exponent(currency: Optional[str]) -> int:
+    """Digits after the decimal point for `currency` (2 when unknown)."""
+    if not currency:
+        return DEFAULT_EXPONENT
+    return CURRENCY_EXPONENTS.get(currency.strip().upper(), DEFAULT_EXPONENT)
+
+
+def to_decimal(value: Number) -> Decimal:
+    """The decimal the value was written as: floats go through their shortest repr."""
+    if isinstance(value, Decimal):
+        return value
+    return Decimal(repr(value)) if isinstance(value, float) else Decimal(str(value))
+
+
+def quantize(value: Number, currency: Optional[str] = None) -> Decimal:
+    """Rounds half away from zero to the currency's minor unit."""
+    return _quantize(to_decimal(value), minor_exponent(currency))
+
+
+def _quantize(value: Decimal, exponent: int) -> Decimal:
+    return value.quantize(Decimal(1).scaleb(-exponent), ROUND_HALF_UP)
+
+
+def to_minor_units(value: Number, currency: Optional[str] = None) -> int:
+    return int(quantize(value, currency).scaleb(minor_exponent(currency)))
+
+
+def line_total_error(
+    quantity: Number, unit_price: Number, line_total: Number, currency: Optional[str] = None
+) -> int:
+    """
+    Minor units between quantity * unit price and the stated line total,
+    both rounded to the currency's minor unit. Exact: no float rounding
+    can turn a correct line into a mismatch.
+    """
+    return _line_total_error(quantity, unit_price, line_total, minor_exponent(currency))
+
+
+def _line_total_error(quantity: Number, unit_price: Number, line_total: Number, exponent: int) -> int:
+    computed = _quantize(to_decimal(quantity) * to_decimal(unit_price), exponent)
+    return abs(int((computed - _quantize(to_decimal(line_total), exponent)).scaleb(exponent)))
+
+
+def exceeds_ratio(value: Number, reference: Number, ratio: float) -> bool:
+    """Exactly whether (value - reference) / reference > ratio; zero references are safe."""
+    value, reference = to_decimal(value), to_decimal(reference)
+    return value - reference > to_decimal(ratio) * reference
+
+
+def price_variance(invoice_price: Number, po_price: Number) -> float:
+    """
+    Relative change of the invoice price over the PO price. A zero PO price
+    gives 0.0 when the invoice is also zero and inf otherwise, instead of
+    dividing by zero.
+    """
+    invoice_price, po_price = float(invoice_price), float(po_price)
+    if po_price == 0:
+        return 0.0 if invoice_price == 0 else math.inf
+    return (invoice_price - po_price) / po_price
+
+
+def format_amount(value: Number, currency: Optional[str] = None) -> str:
+    return f"{quantize(value, currency):,}"
+
+
+# --- Array fast paths -------------------------------------------------------
+
+
+def _scaled(values: np.ndarray, decimals) -> tuple:
+    """
+    int64 values * 10**decimals, and which rows that represents exactly,
+    i.e. the value was written with at most `decimals` places.
+    """
+    factor = 10.0 ** np.asarray(decimals)
+    with np.errstate(invalid="ignore", over="ignore"):
+        scaled = np.rint(values * factor)
+        exact = (np.abs(scaled) < MAX_SCALED) & (scaled / factor == values)
+    return np.where(exact, scaled, 0).astype(np.int64), exact
+
+
+def _round_half_up(values: np.ndarray, divisor: np.ndarray) -> np.ndarray:
+    """Integer division rounding half away from zero, like ROUND_HALF_UP."""
+    return np.sign(values) * ((np.abs(values) + divisor // 2) // divisor)
+
+
+def line_total_errors(
+    quantity: np.ndarray,
+    unit_price: np.ndarray,
+    line_total: np.ndarray,
+    exponents: np.ndarray,
+) -> np.ndarray:
+    """
+    `line_total_error` over arrays, per row in the minor units given by
+    `exponents`. Rows are computed as scaled int64; the few the fast path
+    cannot hold exactly fall back to Decimal, so the result is identical.
+    """
+    exponents = np.asarray(exponents, dtype=np.int64)
+    q, q_exact = _scaled(quantity, QTY_DECIMALS)
+    p, p_exact = _scaled(unit_price, PRICE_DECIMALS)
+    # Totals already in whole minor units need no rounding; others go the
+    # Decimal way.
+    total_minor, t_exact = _scaled(line_total, exponents)
+    fast = q_exact & p_exact & t_exact & (np.abs(quantity * unit_price) < FAST_PATH_MAX_PRODUCT)
+
+    divisor = 10 ** (PRODUCT_DECIMALS - exponents)
+    errors = np.abs(_round_half_up(np.where(fast, q * p, 0), divisor) - total_minor)
+    for row in np.flatnonzero(~fast):
+        errors[row] = _line_total_error(
+            float(quantity[row]), float(unit_price[row]), float(line_total[row]), int(exponents[row])
+        )
+    return errors
+
+
+def exceeds_ratio_array(values: np.ndarray, references: np.ndarray, ratio: float) -> np.ndarray:
+    """`exceeds_ratio` over arrays, in scaled int64 with a Decimal fallback."""
+    fraction = Fraction(str(ratio))
+    v, v_exact = _scaled(values, PRICE_DECIMALS)
+    r, r_exact = _scaled(references, PRICE_DECIMALS)
+    # Keeps (v - r) * denominator inside int64.
+    fast = v_exact & r_exact & (np.abs(values) < 1e6) & (np.abs(references) < 1e6)
+
+    result = (v - r) * fraction.denominator > fraction.numerator * r
+    for row in np.flatnonzero(~fast):
+        result[row] = exceeds_ratio(float(values[row]), float(references[row]), ratio)
+    return result
+
+
+def price_variance_array(invoice_prices: np.ndarray, po_prices: np.ndarray) -> np.ndarray:
+    """`price_variance` over arrays."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        variance = (invoice_prices - po_prices) / po_prices
+    return np.where(po_prices == 0, np.where(invoice_prices == 0, 0.0, math.inf), variance)
+
+
+def exponents_for(currencies: Sequence[Optional[str]]) -> np.ndarray:
+    return np.fromiter((minor_exponent(c) for c in currencies), dtype=np.int64, count=len(currencies))
+
@@ -0,0 +1,131 @@
+import base64
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, BinaryIO, Dict, Optional, Tuple
+
+PDF_MIME_TYPE = "application/pdf"
+
+# Document info keys stamped on page chunks: the source PDF's sha256 and the
+# 1-based page range taken from it, as "first-last/total".
+SOURCE_DOCUMENT_KEY = "/SourceDocument"
+SOURCE_PAGES_KEY = "/SourcePages"
+
+# Read size for streaming encodes. A multiple of 3 so every chunk encodes to
+# whole base64 quanta and chunks can be concatenated without re-padding.
+ENCODE_CHUNK_BYTES = 3 * 256 * 1024
+
+# Seconds between polls while an uploaded file is still being processed.
+UPLOAD_POLL_SECONDS = 1.0
+UPLOAD_TIMEOUT_SECONDS = 120.0
+
+
+def base64_length(n_bytes: int) -> int:
+    return 4 * ((n_bytes + 2) // 3)
+
+
+def inline_footprint(n_bytes: int) -> int:
+    """
+    Peak memory of sending `n_bytes` of PDF inline: the encoded chunks and
+    the joined data URL briefly coexist, and the client decodes the URL
+    back to raw bytes when it builds the request.
+    """
+    return n_bytes + 2 * base64_length(n_bytes)
+
+
+def encode_data_url(source: BinaryIO, mime_type: str = PDF_MIME_TYPE) -> str:
+    """
+    Base64-encodes a binary stream into a data URL, reading it in chunks so
+    the raw file is never held in memory alongside its encoding.
+    """
+    parts = [f"data:{mime_type};base64,"]
+    while True:
+        chunk = source.read(ENCODE_CHUNK_BYTES)
+        if not chunk:
+            break
+        parts.append(base64.b64encode(chunk).decode("ascii"))
+    return "".join(parts)
+
+
+def supports_file_upload(llm: Any) -> bool:
+    """True when the chat model exposes a Gemini client with a Files API."""
+    return hasattr(getattr(llm, "client", None), "files")
+
+
+def upload_pdf(
+    llm: Any, source: BinaryIO, display_name: str
+) -> Tuple[Dict[str, Any], str]:
+    """
+    Streams a PDF to the Gemini Files API. Returns a message content part
+    referencing it and the uploaded file's name, which the caller passes
+    to `delete_upload` once the request is done.
+    """
+    files = llm.client.files
+    uploaded = files.upload(
+        file=source,
+        config={"mime_type": PDF_MIME_TYPE, "display_name": display_name},
+    )
+
+    deadline = time.monotonic() + UPLOAD_TIMEOUT_SECONDS
+    while getattr(uploaded.state, "name", None) == "PROCESSING":
+        if time.monotonic() > deadline:
+            delete_upload(llm, uploaded.name)
+            raise RuntimeError(f"Upload of {display_name} was not processed in time.")
+        time.sleep(UPLOAD_POLL_SECONDS)
+        uploaded = files.get(name=uploaded.name)
+
+    if getattr(uploaded.state, "name", None) == "FAILED":
+        raise RuntimeError(f"Upload of {display_name} failed server-side.")
+
+    part = {"type": "media", "file_uri": uploaded.uri, "mime_type": PDF_MIME_TYPE}
+    return part, uploaded.name
+
+
+def delete_upload(llm: Any, file_name: Optional[str]):
+    if not file_name:
+        return
+    try:
+        llm.client.files.delete(name=file_name)
+    except Exception as e:
+        print(f"⚠️ Could not delete uploaded file {file_name}: {e}")
+
+
+class PayloadBudget:
+    """
+    Caps the memory held by in-flight PDF payloads across all workers.
+
+    Each inline request reserves its estimated footprint for as long as its
+    message is alive; requests that would push the total over `max_bytes`
+    wait for others to finish. A single request larger than the whole
+    budget is admitted only when nothing else is in flight, so it cannot
+    deadlock. `peak_bytes`, `waits` and `wait_seconds` report how close
+    the run came to the ceiling.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.in_flight = 0
+        self.peak_bytes = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self._cond = threading.Condition()
+
+    @contextmanager
+    def reserve(self, n_bytes: int):
+        with self._cond:
+            if self.in_flight and self.in_flight + n_bytes > self.max_bytes:
+                self.waits += 1
+                started = time.monotonic()
+                self._cond.wait_for(
+                    lambda: not self.in_flight
+                    or self.in_flight + n_bytes <= self.max_bytes
+                )
+                self.wait_seconds += time.monotonic() - started
+            self.in_flight += n_bytes
+            self.peak_bytes = max(self.peak_bytes, self.in_flight)
+        try:
+            yield
+        finally:
+            with self._cond:
+                self.in_flight -= n_bytes
+                self._cond.notify_all()
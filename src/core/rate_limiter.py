@@ -0,0 +1,147 @@
+import asyncio
+import random
+import re
+import threading
+import time
+from typing import Optional
+
+from src.core import config
+
+_RETRY_AFTER_PATTERNS = [
+    re.compile(r"retry in ([\d.]+)\s*s", re.IGNORECASE),
+    re.compile(r"retryDelay['\"]?\s*[:=]\s*['\"]?([\d.]+)s", re.IGNORECASE),
+    re.compile(r"retry-after['\"]?\s*[:=]\s*['\"]?([\d.]+)", re.IGNORECASE),
+]
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    error_str = str(error)
+    return "429" in error_str or "RESOURCE_EXHAUSTED" in error_str
+
+
+def parse_retry_after(error: Exception) -> Optional[float]:
+    """Extracts the server's suggested wait (in seconds) from a quota error."""
+    error_str = str(error)
+    for pattern in _RETRY_AFTER_PATTERNS:
+        match = pattern.search(error_str)
+        if match:
+            return float(match.group(1))
+    return None
+
+
+def backoff_delay(
+    attempt: int,
+    retry_after: Optional[float] = None,
+    base: float = config.LLM_BACKOFF_BASE_SECONDS,
+    cap: float = config.LLM_BACKOFF_CAP_SECONDS,
+) -> float:
+    """
+    Exponential backoff with jitter. A retry-after hint from the server
+    takes precedence; jitter keeps concurrent workers from retrying in
+    lockstep.
+    """
+    if retry_after is not None:
+        return min(retry_after, cap) + random.uniform(0, 1)
+    delay = min(cap, base * (2**attempt))
+    return random.uniform(delay / 2, delay)
+
+
+class RateLimiter:
+    """
+    Shared token bucket over requests-per-minute and tokens-per-minute.
+
+    Callers reserve capacity up front and are told how long to wait, so
+    concurrent workers queue in arrival order instead of all hammering the
+    API. On a quota error `penalize()` pauses the bucket and halves the
+    effective rate; each success restores it gradually (AIMD), so sustained
+    exhaustion lowers throughput smoothly instead of freezing the pipeline.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float = config.LLM_REQUESTS_PER_MINUTE,
+        tokens_per_minute: Optional[float] = config.LLM_TOKENS_PER_MINUTE,
+        min_rate_fraction: float = 0.1,
+    ):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.min_rate_fraction = min_rate_fraction
+
+        self._lock = threading.Lock()
+        self._request_balance = 1.0
+        self._token_balance = float(tokens_per_minute or 0)
+        self._last_refill = time.monotonic()
+        self._blocked_until = 0.0
+        self._rate_scale = 1.0
+
+        self.total_wait_seconds = 0.0
+        self.throttle_events = 0
+
+    def _refill(self, now: float):
+        elapsed = now - self._last_refill
+        self._last_refill = now
+
+        # Request capacity is capped at one so bursts are spread out evenly.
+        request_rate = self.requests_per_minute * self._rate_scale / 60.0
+        self._request_balance = min(1.0, self._request_balance + elapsed * request_rate)
+
+        if self.tokens_per_minute:
+            token_rate = self.tokens_per_minute * self._rate_scale / 60.0
+            self._token_balance = min(
+                float(self.tokens_per_minute), self._token_balance + elapsed * token_rate
+            )
+
+    def reserve(self, tokens: int = 0) -> float:
+        """
+        Claims capacity for one request and returns the seconds the caller
+        must wait before sending it. Balances may go negative; that debt is
+        what makes later callers wait longer, in order.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+
+            self._request_balance -= 1.0
+            request_rate = self.requests_per_minute * self._rate_scale / 60.0
+            wait = max(0.0, -self._request_balance / request_rate)
+
+            if self.tokens_per_minute and tokens:
+                self._token_balance -= tokens
+                token_rate = self.tokens_per_minute * self._rate_scale / 60.0
+                wait = max(wait, -self._token_balance / token_rate)
+
+            wait = max(wait, self._blocked_until - now)
+            self.total_wait_seconds += wait
+            return wait
+
+    def acquire(self, tokens: int = 0) -> float:
+        """Blocks the calling thread until a request may be sent."""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, tokens: int = 0) -> float:
+        """Like `acquire`, but yields to the event loop while waiting."""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def settle(self, estimated_tokens: int, actual_tokens: int):
+        """Corrects the token bucket once a response reports real usage."""
+        if not self.tokens_per_minute:
+            return
+        with self._lock:
+            self._token_balance -= actual_tokens - estimated_tokens
+
+    def penalize(self, delay: float):
+        """Pauses every caller for `delay` seconds and halves the rate."""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + delay)
+            self._rate_scale = max(self.min_rate_fraction, self._rate_scale / 2)
+            self.throttle_events += 1
+
+    def record_success(self):
+        with self._lock:
+            self._rate_scale = min(1.0, self._rate_scale + 0.05)
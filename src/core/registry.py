@@ -0,0 +1,214 @@
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, Optional
+
+from src.core import config
+
+
+class ResourceRegistry:
+    """
+    Long-lived, thread-safe home for expensive shared resources.
+
+    The embedding model, the PO database (JSON + FAISS index) and the Gemini
+    client are created once per registry and handed out to every graph
+    invocation. `loads` and `hits` count constructions and reuses per key so
+    a run can confirm each resource was only built once.
+    """
+
+    def __init__(
+        self,
+        po_db_path: str = config.PO_DB_PATH,
+        vector_db_path: str = config.VECTOR_DB_PATH,
+        bypass_extraction_cache: bool = config.BYPASS_EXTRACTION_CACHE,
+        workers: int = 1,
+    ):
+        self.po_db_path = po_db_path
+        self.vector_db_path = vector_db_path
+        self.bypass_extraction_cache = bypass_extraction_cache
+        self.workers = max(workers, 1)
+
+        self._resources: Dict[str, Any] = {}
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+        self.loads: Dict[str, int] = defaultdict(int)
+        self.hits: Dict[str, int] = defaultdict(int)
+        self.load_seconds: Dict[str, float] = {}
+
+    def get_or_create(self, key: str, factory: Callable[[], Any]) -> Any:
+        """
+        Returns the resource stored under `key`, building it with `factory`
+        on first use. Concurrent callers of the same key wait for a single
+        construction instead of each loading their own copy.
+        """
+        with self._lock:
+            if key in self._resources:
+                self.hits[key] += 1
+                return self._resources[key]
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                if key in self._resources:
+                    self.hits[key] += 1
+                    return self._resources[key]
+
+            started = time.perf_counter()
+            resource = factory()
+            elapsed = time.perf_counter() - started
+
+            with self._lock:
+                self._resources[key] = resource
+                self.loads[key] += 1
+                self.load_seconds[key] = elapsed
+            return resource
+
+    def get_embeddings(self):
+        def factory():
+            from langchain_huggingface import HuggingFaceEmbeddings
+
+            return HuggingFaceEmbeddings(model_name=config.EMBEDDING_MODEL_NAME)
+
+        return self.get_or_create("embeddings", factory)
+
+    def get_database(self, json_path: Optional[str] = None):
+        json_path = json_path or self.po_db_path
+
+        def factory():
+            from src.core.database import PurchaseOrderDatabase
+
+            return PurchaseOrderDatabase(
+                json_path,
+                vector_db_path=self.vector_db_path,
+                embeddings=self.get_embeddings(),
+            )
+
+        return self.get_or_create(f"database:{json_path}", factory)
+
+    def get_llm(self, model_name: str = config.LLM_MODEL_NAME):
+        """Chat model for the configured backend (SAFEPAY_LLM_BACKEND)."""
+
+        def factory():
+            if config.LLM_BACKEND == "fake":
+                from src.core.fake_llm import FakeExtractionLLM
+
+                return FakeExtractionLLM(model=f"fake-{model_name}")
+            if config.LLM_BACKEND != "gemini":
+                raise ValueError(
+                    f"Unknown LLM backend '{config.LLM_BACKEND}'. Use 'gemini' or 'fake'."
+                )
+
+            from langchain_google_genai import ChatGoogleGenerativeAI
+
+            return ChatGoogleGenerativeAI(
+                model=model_name,
+                temperature=0,
+                max_output_tokens=config.LLM_MAX_OUTPUT_TOKENS,
+            )
+
+        return self.get_or_create(f"llm:{model_name}", factory)
+
+    def get_text_extractor(self):
+        """Text-layer extractor checking headers against the PO catalog, or None when disabled."""
+        if not config.TEXT_LAYER_EXTRACTION:
+            return None
+
+        def factory():
+            from src.agents.text_layer import TextLayerExtractor
+
+            return TextLayerExtractor(db=self.get_database())
+
+        return self.get_or_create("text_extractor", factory)
+
+    def get_extraction_cache(self):
+        def factory():
+            from src.core.extraction_cache import ExtractionCache
+
+            return ExtractionCache()
+
+        return self.get_or_create("extraction_cache", factory)
+
+    def get_rate_limiter(self):
+        """One limiter per process so all workers share the Gemini quota."""
+
+        def factory():
+            from src.core.rate_limiter import RateLimiter
+
+            return RateLimiter()
+
+        return self.get_or_create("rate_limiter", factory)
+
+    def get_checkpointer(self):
+        """
+        SQLite-backed LangGraph checkpointer shared by all workers (the
+        saver serialises access to its connection).
+        """
+
+        def factory():
+            import os
+            import sqlite3
+
+            from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+            from langgraph.checkpoint.sqlite import SqliteSaver
+
+            os.makedirs(os.path.dirname(config.CHECKPOINT_DB_PATH) or ".", exist_ok=True)
+            conn = sqlite3.connect(config.CHECKPOINT_DB_PATH, check_same_thread=False)
+            # State fields holding our own models must be registered with the
+            # serializer to be deserialized from a checkpoint.
+            serde = JsonPlusSerializer(
+                allowed_msgpack_modules=[
+                    ("src.core.state", "ExtractedLineItem"),
+                    ("src.core.state", "POMatchCandidate"),
+                    ("src.core.state", "Discrepancy"),
+                ]
+            )
+            return SqliteSaver(conn, serde=serde)
+
+        return self.get_or_create("checkpointer", factory)
+
+    def get_payload_budget(self):
+        """Shared ceiling on in-flight PDF payload memory, sized per worker."""
+
+        def factory():
+            from src.core.pdf_payload import PayloadBudget
+
+            return PayloadBudget(config.PDF_WORKER_MEMORY_CEILING_BYTES * self.workers)
+
+        return self.get_or_create("payload_budget", factory)
+
+    def get_metrics(self):
+        def factory():
+            from src.core.metrics import MetricsRegistry
+
+            return MetricsRegistry(resource_loads=self.resource_load_seconds)
+
+        return self.get_or_create("metrics", factory)
+
+    def resource_load_seconds(self) -> Dict[str, float]:
+        with self._lock:
+            return dict(self.load_seconds)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {
+                key: {
+                    "loads": self.loads[key],
+                    "hits": self.hits[key],
+                    "load_seconds": round(self.load_seconds.get(key, 0.0), 3),
+                }
+                for key in self._resources
+            }
+
+
+_default_registry: Optional[ResourceRegistry] = None
+_default_registry_lock = threading.Lock()
+
+
+def get_default_registry() -> ResourceRegistry:
+    """Returns the process-wide registry, creating it on first call."""
+    global _default_registry
+    with _default_registry_lock:
+        if _default_registry is None:
+            _default_registry = ResourceRegistry()
+        return _default_registry
@@ -0,0 +1,336 @@
+import json
+import os
+import sqlite3
+from contextlib import closing
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS invoices (
+    seq INTEGER PRIMARY KEY,
+    source_file TEXT NOT NULL UNIQUE,
+    invoice_id TEXT,
+    action TEXT,
+    supplier TEXT,
+    invoice_date TEXT,
+    matched_po TEXT,
+    confidence REAL,
+    discrepancy_count INTEGER,
+    line_count INTEGER,
+    record TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS invoices_action ON invoices (action, seq);
+CREATE INDEX IF NOT EXISTS invoices_supplier ON invoices (supplier, seq);
+CREATE INDEX IF NOT EXISTS invoices_date ON invoices (invoice_date);
+CREATE INDEX IF NOT EXISTS invoices_confidence ON invoices (confidence);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS aggregates (
+    metric TEXT NOT NULL,
+    key TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    total REAL NOT NULL,
+    PRIMARY KEY (metric, key)
+);
+"""
+
+# Upper bounds (ms) of the node latency histogram buckets.
+LATENCY_BUCKETS_MS = [10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000]
+
+
+SUMMARY_COLUMNS = [
+    "source_file",
+    "invoice_id",
+    "action",
+    "supplier",
+    "invoice_date",
+    "matched_po",
+    "confidence",
+    "discrepancy_count",
+    "line_count",
+]
+
+DATE_FORMATS = ["%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%Y/%m/%d", "%d %B %Y", "%d %b %Y", "%B %d, %Y", "%b %d, %Y"]
+
+
+def latency_bucket(wall_ms: float) -> str:
+    for bound in LATENCY_BUCKETS_MS:
+        if wall_ms <= bound:
+            return str(bound)
+    return "inf"
+
+
+def contributions(record: Dict[str, Any]) -> Dict[Tuple[str, str], Tuple[int, float]]:
+    """
+    What one record adds to the rolled-up metrics, as
+    {(metric, key): (count, total)}:
+
+    - action / supplier / discrepancy_type: counts
+    - day: invoices processed that day and their summed confidence
+    - latency:<agent>: trace steps per latency bucket and their summed ms
+    """
+    results = record.get("processing_results", {})
+    extracted = results.get("extracted_data", {})
+    rows: Dict[Tuple[str, str], List[float]] = {}
+
+    def add(metric: str, key: Optional[str], total: float = 0.0):
+        if key is None:
+            return
+        row = rows.setdefault((metric, key), [0, 0.0])
+        row[0] += 1
+        row[1] += total
+
+    add("action", results.get("recommended_action"))
+    add("supplier", extracted.get("supplier"))
+    for discrepancy in results.get("discrepancies", []):
+        add("discrepancy_type", discrepancy.get("type"))
+    processed_at = record.get("processed_at")
+    if processed_at:
+        add("day", processed_at[:10], results.get("extraction_confidence") or 0.0)
+    for step in results.get("agent_execution_trace", []):
+        sample = step.get("metrics")
+        if sample and step.get("agent"):
+            add(f"latency:{step['agent']}", latency_bucket(sample["wall_ms"]), sample["wall_ms"])
+
+    return {key: (int(count), total) for key, (count, total) in rows.items()}
+
+
+def iso_date(value: Optional[str]) -> Optional[str]:
+    """Normalises an extracted invoice date to YYYY-MM-DD, or None."""
+    if not value:
+        return None
+    value = value.strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date().isoformat()
+        except ValueError:
+            continue
+    return None
+
+
+class ResultsIndex:
+    """
+    SQLite index over the results log for the dashboard.
+
+    One row per source file with the columns the dashboard filters and
+    sorts on (action, supplier, date, confidence), indexed so a page of
+    results is a range scan rather than a pass over every record. The full
+    record is stored alongside as JSON and only read by `get()`.
+
+    ResultsStore keeps the index in step with the JSONL log and records the
+    log size it reflects, so an index left behind by a crash or an older
+    version is detected and rebuilt.
+
+    Aggregates (see `contributions`) are maintained in the same transaction
+    as each write, subtracting a replaced record's share first, so the
+    dashboard reads them in constant time whatever the history size.
+    """
+
+    def __init__(self, path: str = "output/results.sqlite"):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        # A connection per call keeps the index safe to use from pipeline
+        # workers and Streamlit sessions alike; WAL lets readers see a
+        # consistent snapshot while the pipeline writes.
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @staticmethod
+    def _row(record: Dict[str, Any]) -> Tuple:
+        results = record.get("processing_results", {})
+        extracted = results.get("extracted_data", {})
+        return (
+            record["source_file"],
+            record.get("invoice_id"),
+            results.get("recommended_action"),
+            extracted.get("supplier"),
+            iso_date(extracted.get("date")),
+            results.get("matching_results", {}).get("matched_po"),
+            results.get("extraction_confidence"),
+            len(results.get("discrepancies", [])),
+            len(extracted.get("line_items", [])),
+            json.dumps(record),
+        )
+
+    @staticmethod
+    def _apply(conn: sqlite3.Connection, deltas: Dict[Tuple[str, str], Tuple[int, float]]):
+        conn.executemany(
+            """
+            INSERT INTO aggregates (metric, key, count, total) VALUES (?, ?, ?, ?)
+            ON CONFLICT (metric, key) DO UPDATE SET
+            count = count + excluded.count, total = total + excluded.total
+            """,
+            ((metric, key, count, total) for (metric, key), (count, total) in deltas.items()),
+        )
+        conn.execute("DELETE FROM aggregates WHERE count <= 0")
+
+    def _upsert(self, conn: sqlite3.Connection, records: Iterable[Dict[str, Any]]):
+        conn.executemany(
+            f"""
+            INSERT INTO invoices ({", ".join(SUMMARY_COLUMNS)}, record)
+            VALUES ({", ".join("?" * (len(SUMMARY_COLUMNS) + 1))})
+            ON CONFLICT (source_file) DO UPDATE SET
+            {", ".join(f"{c} = excluded.{c}" for c in SUMMARY_COLUMNS[1:])},
+            record = excluded.record
+            """,
+            (self._row(r) for r in records if r.get("source_file")),
+        )
+
+    def _set_log_size(self, conn: sqlite3.Connection, log_size: int):
+        conn.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES ('log_size', ?)",
+            (str(log_size),),
+        )
+
+    def log_size(self) -> Optional[int]:
+        """Size of the results log this index reflects, if known."""
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'log_size'").fetchone()
+        return int(row["value"]) if row else None
+
+    def add(self, records: List[Dict[str, Any]], log_size: int):
+        """Indexes newly appended records (latest record per file wins)."""
+        with closing(self._connect()) as conn, conn:
+            deltas: Dict[Tuple[str, str], Tuple[int, float]] = {}
+
+            def accumulate(record: Dict[str, Any], sign: int):
+                for key, (count, total) in contributions(record).items():
+                    old_count, old_total = deltas.get(key, (0, 0.0))
+                    deltas[key] = (old_count + sign * count, old_total + sign * total)
+
+            for record in records:
+                previous = conn.execute(
+                    "SELECT record FROM invoices WHERE source_file = ?", (record["source_file"],)
+                ).fetchone()
+                if previous:
+                    accumulate(json.loads(previous["record"]), -1)
+                accumulate(record, 1)
+                self._upsert(conn, [record])
+            self._apply(conn, deltas)
+            self._set_log_size(conn, log_size)
+
+    def rebuild(self, records: List[Dict[str, Any]], log_size: int):
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM invoices")
+            conn.execute("DELETE FROM aggregates")
+            self._upsert(conn, records)
+
+            totals: Dict[Tuple[str, str], List[float]] = {}
+            for record in records:
+                for key, (count, total) in contributions(record).items():
+                    row = totals.setdefault(key, [0, 0.0])
+                    row[0] += count
+                    row[1] += total
+            self._apply(conn, {key: (int(c), t) for key, (c, t) in totals.items()})
+            self._set_log_size(conn, log_size)
+
+    def _where(
+        self,
+        actions: Optional[Sequence[str]] = None,
+        supplier: Optional[str] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        min_confidence: Optional[float] = None,
+        search: Optional[str] = None,
+    ) -> Tuple[str, List[Any]]:
+        clauses, params = [], []
+        if actions:
+            clauses.append(f"action IN ({', '.join('?' * len(actions))})")
+            params.extend(actions)
+        if supplier:
+            clauses.append("supplier = ?")
+            params.append(supplier)
+        if date_from:
+            clauses.append("invoice_date >= ?")
+            params.append(date_from)
+        if date_to:
+            clauses.append("invoice_date <= ?")
+            params.append(date_to)
+        if min_confidence is not None:
+            clauses.append("confidence >= ?")
+            params.append(min_confidence)
+        if search:
+            pattern = f"%{search}%"
+            clauses.append(
+                "(source_file LIKE ? OR invoice_id LIKE ? OR supplier LIKE ? OR matched_po LIKE ?)"
+            )
+            params.extend([pattern] * 4)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def query(self, offset: int = 0, limit: int = 50, **filters) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Returns one page of summary rows matching `filters`, in log order,
+        and the total number of matches. Filters: actions, supplier,
+        date_from/date_to (YYYY-MM-DD), min_confidence and search (a
+        substring of the file name, invoice ID, supplier or PO).
+        """
+        where, params = self._where(**filters)
+        with closing(self._connect()) as conn:
+            total = conn.execute(f"SELECT COUNT(*) FROM invoices{where}", params).fetchone()[0]
+            rows = conn.execute(
+                f"SELECT {', '.join(SUMMARY_COLUMNS)} FROM invoices{where} "
+                "ORDER BY seq LIMIT ? OFFSET ?",
+                params + [limit, offset],
+            ).fetchall()
+        return [dict(row) for row in rows], total
+
+    def get(self, source_file: str) -> Optional[Dict[str, Any]]:
+        """The full stored record, execution trace included."""
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT record FROM invoices WHERE source_file = ?", (source_file,)
+            ).fetchone()
+        return json.loads(row["record"]) if row else None
+
+    def iter_records(self, batch_size: int = 1000) -> Iterator[List[Dict[str, Any]]]:
+        """Yields every full record in log order, `batch_size` at a time."""
+        last_seq = -1
+        while True:
+            with closing(self._connect()) as conn:
+                rows = conn.execute(
+                    "SELECT seq, record FROM invoices WHERE seq > ? ORDER BY seq LIMIT ?",
+                    (last_seq, batch_size),
+                ).fetchall()
+            if not rows:
+                return
+            last_seq = rows[-1]["seq"]
+            yield [json.loads(row["record"]) for row in rows]
+
+    def count(self) -> int:
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT COUNT(*) FROM invoices").fetchone()[0]
+
+    def suppliers(self) -> List[str]:
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT DISTINCT supplier FROM invoices WHERE supplier IS NOT NULL ORDER BY supplier"
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def aggregates(self, metric: str, limit: Optional[int] = None) -> Dict[str, Tuple[int, float]]:
+        """{key: (count, total)} for one metric, largest counts first."""
+        sql = "SELECT key, count, total FROM aggregates WHERE metric = ? ORDER BY count DESC"
+        params: List[Any] = [metric]
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with closing(self._connect()) as conn:
+            rows = conn.execute(sql, params).fetchall()
+        return {row["key"]: (row["count"], row["total"]) for row in rows}
+
+    def latency_histograms(self) -> Dict[str, Dict[str, Tuple[int, float]]]:
+        """{agent: {bucket upper bound in ms: (count, summed ms)}}."""
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT metric, key, count, total FROM aggregates WHERE metric LIKE 'latency:%'"
+            ).fetchall()
+        histograms: Dict[str, Dict[str, Tuple[int, float]]] = {}
+        for row in rows:
+            agent = row["metric"].split(":", 1)[1]
+            histograms.setdefault(agent, {})[row["key"]] = (row["count"], row["total"])
+        return histograms
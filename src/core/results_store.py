@@ -0,0 +1,163 @@
+import json
+import os
+import tempfile
+import threading
+from typing import Any, Dict, List, Optional
+
+from src.core.results_index import ResultsIndex
+
+
+class ResultsStore:
+    """
+    Append-only JSONL log of pipeline results.
+
+    Each processed invoice is appended as one line and fsync'd, so a run
+    writes O(n) bytes and a crash can at worst leave one torn trailing
+    line. Records are keyed by `source_file`; when a file appears more
+    than once the latest line wins. `export()` produces the pretty-printed
+    `results.json` list via an atomic rename.
+
+    Unless `index_path` is None, a ResultsIndex is kept in step with the
+    log for the dashboard, and rebuilt when it does not match the log.
+    """
+
+    def __init__(
+        self,
+        path: str = "output/results.jsonl",
+        export_path: str = "output/results.json",
+        index_path: Optional[str] = "output/results.sqlite",
+    ):
+        self.path = path
+        self.export_path = export_path
+        self._lock = threading.Lock()
+
+        if not os.path.exists(self.path) and os.path.exists(self.export_path):
+            self._import_legacy_export()
+
+        self.index = ResultsIndex(index_path) if index_path else None
+        if self.index is not None and self.index.log_size() != self._log_size():
+            self.reindex()
+
+    def _log_size(self) -> int:
+        return os.path.getsize(self.path) if os.path.exists(self.path) else 0
+
+    def reindex(self) -> int:
+        """Rebuilds the results index from the log."""
+        with self._lock:
+            records = self._read_records() if os.path.exists(self.path) else []
+            print(f"🗂️ Indexing {len(records)} results into {self.index.path}...")
+            self.index.rebuild(records, self._log_size())
+        return len(records)
+
+    def _import_legacy_export(self):
+        """Seeds the log from a results.json written by older versions."""
+        try:
+            with open(self.export_path, "r") as f:
+                records = json.load(f)
+        except json.JSONDecodeError as e:
+            raise RuntimeError(
+                f"Existing {self.export_path} is corrupt and cannot be imported: {e}"
+            )
+
+        print(f"📦 Importing {len(records)} records from {self.export_path}...")
+        self._atomic_write(self.path, self._to_jsonl(records))
+
+    def load(self) -> List[Dict[str, Any]]:
+        """Returns the latest record per source file, in first-seen order."""
+        if not os.path.exists(self.path):
+            return []
+
+        with self._lock:
+            return self._read_records()
+
+    def _read_records(self) -> List[Dict[str, Any]]:
+        with open(self.path, "r") as f:
+            lines = f.readlines()
+
+        records: Dict[str, Dict[str, Any]] = {}
+        for lineno, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                if lineno == len(lines) and not line.endswith("\n"):
+                    # Torn write from a crash; drop it so the next append
+                    # starts on a clean line.
+                    print(f"⚠️ Discarding incomplete last record in {self.path}")
+                    self._truncate_tail(len(line.encode("utf-8")))
+                    break
+                raise RuntimeError(f"Corrupt record at {self.path}:{lineno}: {e}")
+            records[record.get("source_file") or f"line-{lineno}"] = record
+
+        return list(records.values())
+
+    def _truncate_tail(self, num_bytes: int):
+        with open(self.path, "r+b") as f:
+            f.seek(0, os.SEEK_END)
+            f.truncate(f.tell() - num_bytes)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def append(self, record: Dict[str, Any]):
+        self.append_many([record])
+
+    def append_many(self, records: List[Dict[str, Any]]):
+        """Appends records with a single write and fsync."""
+        if not records:
+            return
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a") as f:
+                f.write(self._to_jsonl(records))
+                f.flush()
+                os.fsync(f.fileno())
+            if self.index is not None:
+                self.index.add(records, self._log_size())
+
+    def export(self, path: Optional[str] = None) -> int:
+        """
+        Checkpoints the current results into today's results.json shape.
+        Readers always see either the previous or the new complete file.
+        """
+        records = self.load()
+        self._atomic_write(path or self.export_path, json.dumps(records, indent=2))
+        return len(records)
+
+    def compact(self) -> int:
+        """Rewrites the log keeping only the latest record per source file."""
+        if not os.path.exists(self.path):
+            return 0
+        with self._lock:
+            records = self._read_records()
+            self._atomic_write(self.path, self._to_jsonl(records))
+            if self.index is not None:
+                self.index.rebuild(records, self._log_size())
+        return len(records)
+
+    @staticmethod
+    def _to_jsonl(records: List[Dict[str, Any]]) -> str:
+        return "".join(json.dumps(r) + "\n" for r in records)
+
+    @staticmethod
+    def _atomic_write(path: str, content: str):
+        directory = os.path.dirname(path) or "."
+        os.makedirs(directory, exist_ok=True)
+
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".json")
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(content)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        dir_fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
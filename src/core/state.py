@@ -10,6 +10,38 @@ class ExtractedLineItem(BaseModel):
     confidence: float
 
 
+# --- LLM extraction schemas (bound as the response schema in structured mode) ---
+
+
+class InvoiceExtraction(BaseModel):
+    invoice_id: Optional[str] = None
+    supplier_name: Optional[str] = None
+    date: Optional[str] = None
+    po_reference: Optional[str] = Field(None, description="null if missing or unreadable")
+    currency: Optional[str] = Field(None, description="ISO 4217 code, e.g. GBP")
+    items: List[ExtractedLineItem] = Field(default_factory=list)
+    overall_confidence: float = 0.0
+    notes: str = ""
+
+
+class LineItemsExtraction(BaseModel):
+    items: List[ExtractedLineItem] = Field(default_factory=list)
+    first_item_continued: bool = Field(
+        False,
+        description="true if the first item is the rest of a row that began on the previous page",
+    )
+    overall_confidence: float = 0.0
+    notes: str = ""
+
+
+class LineItemCorrection(ExtractedLineItem):
+    index: int
+
+
+class LineItemRepair(BaseModel):
+    items: List[LineItemCorrection] = Field(default_factory=list)
+
+
 class Discrepancy(BaseModel):
     type: str
     severity: str
@@ -38,13 +70,22 @@ class AgentState(BaseModel):
     extracted_invoice_id: Optional[str] = None
     extracted_supplier: Optional[str] = None
     extracted_date: Optional[str] = None
+    extracted_currency: Optional[str] = None
     extracted_po_ref: Optional[str] = None
     extracted_items: List[ExtractedLineItem] = Field(default_factory=list)
     extraction_confidence: float = 0.0
     extraction_reasoning: str = ""
+    extraction_cache_hit: bool = False
+    extraction_method: str = ""
+    llm_wait_seconds: float = 0.0
+    pdf_payload_bytes: int = 0
+    llm_calls: int = 0
+    llm_input_tokens: int = 0
+    llm_output_tokens: int = 0
 
 
     verification_flags: List[str] = Field(default_factory=list)
+    failed_item_indices: List[int] = Field(default_factory=list)
     math_verification_passed: bool = False
 
 
@@ -54,6 +95,7 @@ class AgentState(BaseModel):
 
 
     discrepancies: List[Discrepancy] = Field(default_factory=list)
+    unmatched_po_lines: List[str] = Field(default_factory=list)
 
 
     final_action: str = "pending"
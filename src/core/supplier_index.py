@@ -0,0 +1,113 @@
+import re
+from collections import defaultdict
+from typing import Dict, List, Set, Tuple
+
+# Legal-form tokens that vary between documents of the same supplier.
+LEGAL_SUFFIXES = {
+    "ltd",
+    "limited",
+    "inc",
+    "incorporated",
+    "plc",
+    "llc",
+    "llp",
+    "gmbh",
+    "ag",
+    "sa",
+    "co",
+    "corp",
+    "corporation",
+    "company",
+    "the",
+}
+
+CLOSED_PO_STATUSES = {"closed", "cancelled", "canceled", "fully_invoiced"}
+
+
+def normalize_supplier(name: str) -> str:
+    """'Global Pharma Supply Co.' -> 'global pharma supply'"""
+    text = (name or "").lower().replace("&", " and ")
+    tokens = re.sub(r"[^a-z0-9]+", " ", text).split()
+    kept = [t for t in tokens if t not in LEGAL_SUFFIXES]
+    return " ".join(kept or tokens)
+
+
+def trigrams(text: str) -> Set[str]:
+    padded = f"  {text} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def is_open_po(po: Dict) -> bool:
+    return str(po.get("status", "open")).lower() not in CLOSED_PO_STATUSES
+
+
+class SupplierIndex:
+    """
+    Resolves free-text supplier names to canonical suppliers and their open
+    POs.
+
+    Every PO's supplier name (and any `supplier_aliases` listed on the PO)
+    is normalized and indexed by character trigrams. Lookups first try an
+    exact normalized match, then score only the aliases sharing trigrams
+    with the query, so the cost depends on the query, not the catalog size.
+    """
+
+    def __init__(self, purchase_orders: Dict[str, Dict]):
+        self.display_names: Dict[str, str] = {}
+        self.alias_to_canonical: Dict[str, str] = {}
+        self.partitions: Dict[str, List[str]] = defaultdict(list)
+        self._alias_trigrams: Dict[str, Set[str]] = {}
+        self._trigram_index: Dict[str, Set[str]] = defaultdict(set)
+
+        for po_number, po in purchase_orders.items():
+            self.add_purchase_order(po_number, po)
+
+    def add_purchase_order(self, po_number: str, po: Dict):
+        canonical = normalize_supplier(po["supplier"])
+        self.display_names.setdefault(canonical, po["supplier"])
+
+        for alias in [po["supplier"], *po.get("supplier_aliases", [])]:
+            self._add_alias(normalize_supplier(alias), canonical)
+
+        if is_open_po(po):
+            self.partitions[canonical].append(po_number)
+
+    def _add_alias(self, alias: str, canonical: str):
+        if alias in self.alias_to_canonical:
+            return
+        self.alias_to_canonical[alias] = canonical
+        grams = trigrams(alias)
+        self._alias_trigrams[alias] = grams
+        for gram in grams:
+            self._trigram_index[gram].add(alias)
+
+    def resolve(
+        self, supplier_name: str, min_score: float = 0.6, limit: int = 3
+    ) -> List[Tuple[str, float]]:
+        """
+        Returns up to `limit` (canonical supplier, similarity) pairs, best
+        first. Similarity is the Dice coefficient over trigrams.
+        """
+        query = normalize_supplier(supplier_name)
+        if not query:
+            return []
+        if query in self.alias_to_canonical:
+            return [(self.alias_to_canonical[query], 1.0)]
+
+        query_grams = trigrams(query)
+        shared: Dict[str, int] = defaultdict(int)
+        for gram in query_grams:
+            for alias in self._trigram_index.get(gram, ()):
+                shared[alias] += 1
+
+        best: Dict[str, float] = {}
+        for alias, overlap in shared.items():
+            score = 2 * overlap / (len(query_grams) + len(self._alias_trigrams[alias]))
+            canonical = self.alias_to_canonical[alias]
+            if score >= min_score and score > best.get(canonical, 0.0):
+                best[canonical] = score
+
+        return sorted(best.items(), key=lambda x: x[1], reverse=True)[:limit]
+
+    def purchase_orders_for(self, canonical: str) -> List[str]:
+        return self.partitions.get(canonical, [])
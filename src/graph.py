@@ -1,22 +1,44 @@
+from functools import partial
+from typing import Optional
 from langgraph.graph import StateGraph, END
+from src.core.metrics import instrument
 from src.core.state import AgentState
+from src.core.registry import ResourceRegistry, get_default_registry
 from src.agents.doc_intelligence import DocumentIntelligenceAgent
 from src.agents.verifier import ExtractionVerifier
 from src.agents.matching import MatchingAgent
 from src.agents.discrepancy import DiscrepancyDetectorAgent
 from src.agents.resolution import ResolutionAgent
 
-def extract_node(state: AgentState):
-    agent = DocumentIntelligenceAgent()
+def extract_node(state: AgentState, registry: ResourceRegistry):
+    agent = registry.get_or_create(
+        "agent:document_intelligence",
+        lambda: DocumentIntelligenceAgent(
+            llm=registry.get_llm(),
+            cache=registry.get_extraction_cache(),
+            bypass_cache=registry.bypass_extraction_cache,
+            rate_limiter=registry.get_rate_limiter(),
+            payload_budget=registry.get_payload_budget(),
+            text_extractor=registry.get_text_extractor(),
+        ),
+    )
     new_state = agent.process(state)
 
-    
+    detail = (
+        f"Extracted {len(new_state.extracted_items)} line items via "
+        f"{new_state.extraction_method}. Notes: {new_state.extraction_reasoning}"
+    )
+    if new_state.llm_calls:
+        detail += (
+            f" [LLM: {new_state.llm_calls} call(s), {new_state.llm_input_tokens} in / "
+            f"{new_state.llm_output_tokens} out tokens]"
+        )
     new_state.agent_trace.append(
         {
             "agent": "Document Intelligence",
             "status": "Success",
             "confidence": new_state.extraction_confidence,
-            "detail": f"Extracted {len(new_state.extracted_items)} line items. Notes: {new_state.extraction_reasoning}",
+            "detail": detail,
         }
     )
     return new_state
@@ -25,24 +47,24 @@ def extract_node(state: AgentState):
 def verify_node(state: AgentState):
     agent = ExtractionVerifier()
     new_state = agent.verify(state)
+    new_state.agent_trace.append(verify_trace(new_state))
+    return new_state
 
+
+def verify_trace(state: AgentState) -> dict:
    
-    status = "Passed" if new_state.math_verification_passed else "Failed"
+    status = "Passed" if state.math_verification_passed else "Failed"
     detail = (
         "Math checks passed."
-        if new_state.math_verification_passed
-        else f"Found math errors: {new_state.verification_flags}"
-    )
-
-    new_state.agent_trace.append(
-        {
-            "agent": "Extraction Verifier",
-            "status": status,
-            "confidence": 1.0,
-            "detail": detail,
-        }
+        if state.math_verification_passed
+        else f"Found math errors: {state.verification_flags}"
     )
-    return new_state
+    return {
+        "agent": "Extraction Verifier",
+        "status": status,
+        "confidence": 1.0,
+        "detail": detail,
+    }
 
 
 def retry_node(state: AgentState):
@@ -62,69 +84,81 @@ def retry_node(state: AgentState):
     return state
 
 
-def match_node(state: AgentState):
+def match_node(state: AgentState, registry: ResourceRegistry):
   
-    agent = MatchingAgent(db_path="data/purchase_orders.json")
+    agent = registry.get_or_create(
+        "agent:matching", lambda: MatchingAgent(db=registry.get_database())
+    )
     new_state = agent.match(state)
+    new_state.agent_trace.append(match_trace(new_state))
+    return new_state
 
-    if new_state.matched_po_id:
+
+def match_trace(state: AgentState) -> dict:
+    if state.matched_po_id:
         status = "Success"
         conf = (
-            new_state.match_candidates[0].confidence
-            if new_state.match_candidates
+            state.match_candidates[0].confidence
+            if state.match_candidates
             else 0.0
         )
     else:
         status = "No Match"
         conf = 0.0
 
-    new_state.agent_trace.append(
-        {
-            "agent": "Matching Agent",
-            "status": status,
-            "confidence": conf,
-            "detail": new_state.match_reasoning,
-        }
-    )
-    return new_state
+    return {
+        "agent": "Matching Agent",
+        "status": status,
+        "confidence": conf,
+        "detail": state.match_reasoning,
+    }
 
 
-def discrepancy_node(state: AgentState):
-    agent = DiscrepancyDetectorAgent(db_path="data/purchase_orders.json")
+def discrepancy_node(state: AgentState, registry: ResourceRegistry):
+    agent = registry.get_or_create(
+        "agent:discrepancy",
+        lambda: DiscrepancyDetectorAgent(db=registry.get_database()),
+    )
     new_state = agent.check(state)
+    new_state.agent_trace.append(discrepancy_trace(new_state))
+    return new_state
 
-    count = len(new_state.discrepancies)
+
+def discrepancy_trace(state: AgentState) -> dict:
+    count = len(state.discrepancies)
     detail = f"Found {count} discrepancies."
     if count > 0:
-        types = [d.type for d in new_state.discrepancies]
+        types = [d.type for d in state.discrepancies]
         detail += f" Types: {', '.join(types)}"
+    if state.unmatched_po_lines:
+        detail += (
+            f" PO lines not invoiced: {', '.join(state.unmatched_po_lines)}"
+        )
 
-    new_state.agent_trace.append(
-        {
-            "agent": "Discrepancy Detector",
-            "status": "Flagged" if count > 0 else "Clean",
-            "confidence": 1.0,  
-            "detail": detail,
-        }
-    )
-    return new_state
+    return {
+        "agent": "Discrepancy Detector",
+        "status": "Flagged" if count > 0 else "Clean",
+        "confidence": 1.0,  
+        "detail": detail,
+    }
 
 
 def resolution_node(state: AgentState):
     agent = ResolutionAgent()
     new_state = agent.resolve(state)
-
-    new_state.agent_trace.append(
-        {
-            "agent": "Resolution Agent",
-            "status": "Complete",
-            "confidence": 1.0,
-            "detail": f"Action: {new_state.final_action}. Reason: {new_state.final_report_reasoning}",
-        }
-    )
+    new_state.agent_trace.append(resolution_trace(new_state))
     return new_state
 
 
+def resolution_trace(state: AgentState) -> dict:
+    return {
+        "agent": "Resolution Agent",
+        "status": "Complete",
+        "confidence": 1.0,
+        "detail": f"Action: {state.final_action}. Reason: {state.final_report_reasoning}",
+    }
+
+
 def should_retry_extraction(state: AgentState):
     """
     Decides if we should loop back.
@@ -134,16 +168,30 @@ def should_retry_extraction(state: AgentState):
         return "retry"
     return "continue"
 
-def build_graph():
+def build_graph(registry: Optional[ResourceRegistry] = None, checkpointer=None):
+    """
+    Compiles the reconciliation graph. Every node shares the agents and
+    resources held by `registry` (the process-wide one by default), so the
+    embedding model, PO database and LLM client load once per process.
+    With a `checkpointer`, the state is persisted after every node and an
+    interrupted invoice can be resumed from its last completed node. Every
+    node is instrumented; its timings land in the trace and in
+    `registry.get_metrics()`.
+    """
+    registry = registry or get_default_registry()
+    metrics = registry.get_metrics()
     builder = StateGraph(AgentState)
 
-  
-    builder.add_node("extract", extract_node)
-    builder.add_node("verify", verify_node)
-    builder.add_node("retry_logic", retry_node)  
-    builder.add_node("match", match_node)
-    builder.add_node("discrepancy", discrepancy_node)
-    builder.add_node("resolve", resolution_node)
+    nodes = {
+        "extract": partial(extract_node, registry=registry),
+        "verify": verify_node,
+        "retry_logic": retry_node,
+        "match": partial(match_node, registry=registry),
+        "discrepancy": partial(discrepancy_node, registry=registry),
+        "resolve": resolution_node,
+    }
+    for name, node in nodes.items():
+        builder.add_node(name, instrument(name, node, metrics))
 
 
     builder.set_entry_point("extract")
@@ -162,4 +210,4 @@ def build_graph():
     builder.add_edge("discrepancy", "resolve")
     builder.add_edge("resolve", END)
 
-    return builder.compile()
+    return builder.compile(checkpointer=checkpointer)
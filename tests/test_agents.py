@@ -0,0 +1,21 @@
+import pytest
+
+from src.agents.discrepancy import DiscrepancyDetectorAgent
+from src.agents.matching import MatchingAgent
+from src.core import config, database
+
+
+@pytest.mark.parametrize("agent_class", [MatchingAgent, DiscrepancyDetectorAgent])
+def test_agents_open_the_configured_po_database_by_default(monkeypatch, agent_class):
+    opened = []
+    monkeypatch.setattr(database, "PurchaseOrderDatabase", lambda path: opened.append(path) or path)
+
+    assert agent_class().db == config.PO_DB_PATH
+    assert agent_class("other.json").db == "other.json"
+    assert opened == [config.PO_DB_PATH, "other.json"]
+
+
+@pytest.mark.parametrize("agent_class", [MatchingAgent, DiscrepancyDetectorAgent])
+def test_agents_reuse_a_shared_database(agent_class):
+    shared = object()
+    assert agent_class(db=shared).db is shared
@@ -0,0 +1,69 @@
+import copy
+
+import pytest
+
+from benchmarks.pipeline_benchmark import HashingEmbeddings, StubExtractor
+from benchmarks.synthetic import NoiseProfile, generate_invoices, iter_purchase_orders, write_catalog
+from src.agents.discrepancy import DiscrepancyDetectorAgent
+from src.agents.matching import MatchingAgent
+from src.agents.verifier import ExtractionVerifier
+from src.core.database import PurchaseOrderDatabase
+from src.core.state import AgentState
+
+
+@pytest.fixture(scope="module")
+def matched(tmp_path_factory):
+    path = tmp_path_factory.mktemp("catalog")
+    write_catalog(str(path / "po.json"), iter_purchase_orders(300, n_suppliers=60, seed=3))
+    db = PurchaseOrderDatabase(
+        str(path / "po.json"), vector_db_path=str(path / "index"), embeddings=HashingEmbeddings()
+    )
+    noise = NoiseProfile(math_error=0.3, price_trap=0.3)
+    payloads = {
+        f"invoice_{i}.pdf": payload
+        for i, (payload, _) in enumerate(generate_invoices(list(db.data.values()), 200, noise, 5))
+    }
+    extractor = StubExtractor(payloads)
+    states = [extractor.process(AgentState(file_path=name)) for name in payloads]
+    return db, states
+
+
+def _plain(value):
+    if isinstance(value, list):
+        return [_plain(v) for v in value]
+    return value.model_dump() if hasattr(value, "model_dump") else value
+
+
+def _dump(states, fields):
+    return [{field: _plain(getattr(state, field)) for field in fields} for state in states]
+
+
+def test_batch_matching_agrees_with_one_at_a_time(matched):
+    db, states = matched
+    agent = MatchingAgent(db=db)
+    batch = agent.match_batch(copy.deepcopy(states))
+    scalar = [agent.match(s) for s in copy.deepcopy(states)]
+
+    fields = ("matched_po_id", "match_candidates")
+    assert _dump(batch, fields) == _dump(scalar, fields)
+    assert sum(s.matched_po_id is not None for s in batch) > 150
+
+
+def test_batch_checks_agree_with_one_at_a_time(matched):
+    db, states = matched
+    states = MatchingAgent(db=db).match_batch(copy.deepcopy(states))
+    verifier, detector = ExtractionVerifier(), DiscrepancyDetectorAgent(db=db)
+
+    batch = detector.check_batch(verifier.verify_batch(copy.deepcopy(states)))
+    scalar = [detector.check(verifier.verify(s)) for s in copy.deepcopy(states)]
+
+    fields = (
+        "math_verification_passed",
+        "failed_item_indices",
+        "verification_flags",
+        "discrepancies",
+        "unmatched_po_lines",
+    )
+    assert _dump(batch, fields) == _dump(scalar, fields)
+    assert any(not s.math_verification_passed for s in batch)
+    assert any(d.type == "price_mismatch" for s in batch for d in s.discrepancies)
@@ -0,0 +1,59 @@
+import pytest
+
+import main
+from benchmarks.pipeline_benchmark import HashingEmbeddings
+from src.agents.discrepancy import DiscrepancyDetectorAgent
+from src.core import config
+from src.core.extraction_cache import ExtractionCache
+from src.core.fake_llm import FakeExtractionLLM
+from src.core.registry import ResourceRegistry
+from src.graph import build_graph
+
+INVOICE = "data/invoices/Invoice_2_Scanned.pdf"
+
+llm_calls = []
+
+
+class CountingLLM(FakeExtractionLLM):
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        llm_calls.append(messages)
+        return super()._generate(messages, stop, run_manager, **kwargs)
+
+
+def _graph(tmp_path):
+    registry = ResourceRegistry(vector_db_path=str(tmp_path / "index"), bypass_extraction_cache=True)
+    registry.get_or_create("embeddings", HashingEmbeddings)
+    registry.get_or_create("extraction_cache", lambda: ExtractionCache(str(tmp_path / "cache")))
+    registry.get_or_create(
+        f"llm:{config.LLM_MODEL_NAME}",
+        lambda: CountingLLM(
+            recordings_dir=None, latency_ms=0, rate_limit_rate=0, error_rate=0, requests_per_minute=0
+        ),
+    )
+    return build_graph(registry, checkpointer=registry.get_checkpointer())
+
+
+def test_interrupted_invoice_resumes_after_the_last_completed_node(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "CHECKPOINT_DB_PATH", str(tmp_path / "checkpoints.sqlite"))
+    llm_calls.clear()
+
+    def crash(self, state):
+        raise RuntimeError("worker killed")
+
+    graph = _graph(tmp_path)
+    with monkeypatch.context() as patch:
+        patch.setattr(DiscrepancyDetectorAgent, "check", crash)
+        with pytest.raises(RuntimeError, match="worker killed"):
+            main.process_invoice(graph, INVOICE)
+    assert len(llm_calls) == 1
+    assert graph.get_state(main.checkpoint_config(INVOICE)).next == ("discrepancy",)
+
+    # A fresh process: new graph and registry over the same checkpoint file.
+    graph = _graph(tmp_path)
+    output = main.process_invoice(graph, INVOICE)
+
+    assert len(llm_calls) == 1
+    trace = [step["agent"] for step in output["processing_results"]["agent_execution_trace"]]
+    assert trace.count("Document Intelligence") == 1
+    assert trace[-1] == "Resolution Agent"
+    assert output["processing_results"]["extracted_data"]["line_items"]
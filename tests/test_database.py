@@ -0,0 +1,121 @@
+import json
+
+import numpy as np
+import pytest
+
+from benchmarks.pipeline_benchmark import HashingEmbeddings
+from benchmarks.synthetic import iter_purchase_orders, write_catalog
+from src.core import vector_index
+from src.core.database import PurchaseOrderDatabase
+
+
+class CountingEmbeddings(HashingEmbeddings):
+    def __init__(self):
+        super().__init__()
+        self.embedded = 0
+
+    def embed_documents(self, texts):
+        self.embedded += len(texts)
+        return super().embed_documents(texts)
+
+
+def _open(tmp_path, index_type, compression, embeddings):
+    return PurchaseOrderDatabase(
+        str(tmp_path / "po.json"),
+        vector_db_path=str(tmp_path / "index"),
+        embeddings=embeddings,
+        index_type=index_type,
+        compression=compression,
+    )
+
+
+def _edit_catalog(path):
+    with open(path) as f:
+        catalog = json.load(f)
+    pos = catalog["purchase_orders"]
+    pos[0]["line_items"][0]["description"] = "Completely Different Excipient"
+    new_po = dict(pos[1], po_number="PO-NEW-0001", supplier="Brand New Supplier Ltd")
+    del pos[2]
+    pos.append(new_po)
+    with open(path, "w") as f:
+        json.dump(catalog, f)
+
+
+@pytest.mark.parametrize(
+    "index_type, compression",
+    [
+        ("flat", "none"),
+        ("flat", "int8"),
+        ("hnsw", "none"),
+        ("hnsw", "int8"),
+        ("ivfpq", "none"),
+    ],
+)
+def test_refresh_only_embeds_added_and_changed_pos(tmp_path, monkeypatch, index_type, compression):
+    # Lets a small catalog build a real IVF-PQ index.
+    monkeypatch.setattr(vector_index, "MIN_TRAINING_VECTORS", 100)
+    write_catalog(str(tmp_path / "po.json"), iter_purchase_orders(400, seed=1))
+    _open(tmp_path, index_type, compression, CountingEmbeddings())
+
+    _edit_catalog(tmp_path / "po.json")
+    embeddings = CountingEmbeddings()
+    db = _open(tmp_path, index_type, compression, embeddings)
+
+    # One edited PO and one added PO; the removed and 397 unchanged ones
+    # come from the stored vectors.
+    assert embeddings.embedded == 2
+    assert db.vector_store.index.ntotal == 400
+    assert "PO-NEW-0001" in db.vector_store.index_to_docstore_id.values()
+
+    PurchaseOrderDatabase(
+        str(tmp_path / "po.json"),
+        vector_db_path=str(tmp_path / "fresh"),
+        embeddings=HashingEmbeddings(),
+        index_type=index_type,
+        compression=compression,
+    )
+    stored = np.load(tmp_path / "index" / "vectors.npy")
+    rebuilt = np.load(tmp_path / "fresh" / "vectors.npy")
+    assert np.array_equal(stored, rebuilt)
+
+
+def test_unchanged_catalog_embeds_nothing(tmp_path):
+    write_catalog(str(tmp_path / "po.json"), iter_purchase_orders(20, seed=1))
+    _open(tmp_path, "flat", "none", CountingEmbeddings())
+
+    embeddings = CountingEmbeddings()
+    _open(tmp_path, "flat", "none", embeddings)
+    assert embeddings.embedded == 0
+
+
+def test_changed_source_is_detected_and_upserted(tmp_path):
+    write_catalog(str(tmp_path / "po.json"), iter_purchase_orders(20, seed=1))
+    _open(tmp_path, "flat", "none", HashingEmbeddings())
+    with open(tmp_path / "po.json") as f:
+        pos = json.load(f)["purchase_orders"]
+    edited, removed = pos[0]["po_number"], pos[2]["po_number"]
+
+    _edit_catalog(tmp_path / "po.json")
+    db = _open(tmp_path, "flat", "none", HashingEmbeddings())
+
+    indexed = set(db.vector_store.index_to_docstore_id.values())
+    assert indexed == set(db.data)
+    assert removed not in indexed
+    assert "Completely Different Excipient" in db.vector_store.docstore.search(edited).page_content
+    assert "PO-NEW-0001" in indexed
+
+    with open(tmp_path / "index" / "manifest.json") as f:
+        manifest = json.load(f)
+    assert set(manifest["po_hashes"]) == set(db.data)
+
+
+def test_index_from_another_embedding_model_is_rebuilt(tmp_path):
+    write_catalog(str(tmp_path / "po.json"), iter_purchase_orders(20, seed=1))
+    _open(tmp_path, "flat", "none", CountingEmbeddings())
+
+    class OtherModel(CountingEmbeddings):
+        model_name = "other-model"
+
+    embeddings = OtherModel()
+    _open(tmp_path, "flat", "none", embeddings)
+    assert embeddings.embedded == 20
@@ -0,0 +1,124 @@
+from src.agents.doc_intelligence import DocumentIntelligenceAgent
+
+
+def _item(description, quantity, unit_price, line_total, confidence=0.9):
+    return {
+        "description": description,
+        "quantity": quantity,
+        "unit_price": unit_price,
+        "line_total": line_total,
+        "confidence": confidence,
+    }
+
+
+def _chunks(second_items, continued):
+    first = {
+        "invoice_id": "INV-1",
+        "supplier_name": "PharmaChem Supplies Ltd",
+        "items": [_item("Lactose", 10, 2.0, 20.0), _item("Talc Pharma Grade", 5, 8.8, 44.0)],
+        "overall_confidence": 0.95,
+        "notes": "",
+    }
+    second = {"items": second_items, "overall_confidence": 0.9, "notes": "", "first_item_continued": continued}
+    return [first, second]
+
+
+def test_identical_lines_at_a_page_break_are_both_kept():
+    merged = DocumentIntelligenceAgent._merge_payloads(
+        _chunks([_item("Talc Pharma Grade", 5, 8.8, 44.0), _item("Gelatin", 1, 45.0, 45.0)], False)
+    )
+
+    assert [i["description"] for i in merged["items"]] == [
+        "Lactose",
+        "Talc Pharma Grade",
+        "Talc Pharma Grade",
+        "Gelatin",
+    ]
+    assert sum(i["line_total"] for i in merged["items"]) == 153.0
+    assert merged["invoice_id"] == "INV-1"
+    assert merged["overall_confidence"] == 0.9
+
+
+def test_row_split_across_the_page_break_is_joined():
+    # The description wraps onto the next page, where the total is printed.
+    first, second = _chunks([_item("USP", 0.0, 0.0, 1500.0, 0.8), _item("Gelatin", 1, 45.0, 45.0)], True)
+    first["items"][-1] = _item("Hypromellose 2910", 80, 18.75, 0.0)
+
+    merged = DocumentIntelligenceAgent._merge_payloads([first, second])
+
+    assert merged["items"][1:] == [
+        _item("Hypromellose 2910 USP", 80, 18.75, 1500.0, 0.8),
+        _item("Gelatin", 1, 45.0, 45.0),
+    ]
+
+
+def test_row_repeated_as_carried_over_is_kept_once():
+    merged = DocumentIntelligenceAgent._merge_payloads(
+        _chunks([_item("Talc Pharma Grade", 5, 8.8, 44.0)], True)
+    )
+
+    assert [i["description"] for i in merged["items"]] == ["Lactose", "Talc Pharma Grade"]
+
+
+def _repair_agent(tmp_path, **llm_kwargs):
+    from src.core.extraction_cache import ExtractionCache
+    from src.core.fake_llm import FakeExtractionLLM
+
+    llm = FakeExtractionLLM(
+        recordings_dir=None,
+        latency_ms=0,
+        rate_limit_rate=0,
+        requests_per_minute=0,
+        **{"error_rate": 0, **llm_kwargs},
+    )
+    return DocumentIntelligenceAgent(
+        llm=llm, cache=ExtractionCache(str(tmp_path)), bypass_cache=False
+    )
+
+
+def _failed_state():
+    from src.core.state import AgentState, ExtractedLineItem
+
+    return AgentState(
+        file_path="data/invoices/Invoice_1_Baseline.pdf",
+        retry_count=1,
+        failed_item_indices=[1],
+        extracted_invoice_id="INV-1",
+        extracted_items=[
+            ExtractedLineItem(**_item("Lactose", 10, 2.0, 20.0)),
+            ExtractedLineItem(**_item("Talc Pharma Grade", 5, 8.8, 4.4)),
+        ],
+    )
+
+
+def test_repair_merges_corrected_lines_and_updates_the_cache(tmp_path):
+    agent = _repair_agent(tmp_path)
+    state = _failed_state()
+    key = agent._cache_key(state.file_path)
+    agent.cache.put(key, {"invoice_id": "INV-1", "supplier_name": "PharmaChem", "items": []})
+
+    state = agent.process(state)
+
+    assert state.extraction_method == "repair"
+    assert state.llm_calls == 1
+    assert [(i.description, i.line_total) for i in state.extracted_items] == [
+        ("Lactose", 20.0),
+        ("Talc Pharma Grade", 44.0),
+    ]
+    cached = agent.cache.get(key)
+    assert cached["supplier_name"] == "PharmaChem"
+    assert [i["line_total"] for i in cached["items"]] == [20.0, 44.0]
+
+
+def test_failed_repair_falls_back_to_a_full_extraction(tmp_path):
+    agent = _repair_agent(tmp_path, error_rate=1.0)
+    extracted = []
+    agent._extract_document = lambda state: extracted.append(state) or [
+        {"invoice_id": "INV-1", "items": [_item("Lactose", 10, 2.0, 20.0)]}
+    ]
+
+    state = agent.process(_failed_state())
+
+    assert len(extracted) == 1
+    assert state.extraction_method == "llm"
+    assert [i.description for i in state.extracted_items] == ["Lactose"]
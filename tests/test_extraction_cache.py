@@ -0,0 +1,99 @@
+import builtins
+import os
+import time
+
+from src.core.extraction_cache import ExtractionCache
+
+DAY = 24 * 3600
+
+
+def _cache(tmp_path, **kwargs):
+    kwargs.setdefault("ttl_seconds", DAY)
+    kwargs.setdefault("max_bytes", 10**9)
+    return ExtractionCache(cache_dir=str(tmp_path), **kwargs)
+
+
+def _age(cache, key, written_ago, read_ago):
+    now = time.time()
+    os.utime(cache._entry_path(key), (now - read_ago, now - written_ago))
+
+
+def test_round_trip_and_counters(tmp_path):
+    cache = _cache(tmp_path)
+    key = ExtractionCache.make_key("sha", "model", "v1")
+    assert cache.get(key) is None
+    cache.put(key, {"items": [1]})
+
+    assert cache.get(key) == {"items": [1]}
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert key != ExtractionCache.make_key("sha", "model", "v2")
+
+
+def test_reads_do_not_extend_the_ttl(tmp_path):
+    cache = _cache(tmp_path)
+    cache.put("aa" * 32, {"x": 1})
+    _age(cache, "aa" * 32, written_ago=2 * DAY, read_ago=60)
+
+    cache.evict()
+    assert not os.path.exists(cache._entry_path("aa" * 32))
+
+
+def test_get_touches_access_time_only(tmp_path):
+    cache = _cache(tmp_path)
+    cache.put("aa" * 32, {"x": 1})
+    _age(cache, "aa" * 32, written_ago=3600, read_ago=3600)
+    written = os.stat(cache._entry_path("aa" * 32)).st_mtime
+
+    cache.get("aa" * 32)
+    stat = os.stat(cache._entry_path("aa" * 32))
+    assert stat.st_mtime == written
+    assert stat.st_atime > written + 3000
+
+
+def test_expired_entry_is_a_miss(tmp_path):
+    cache = _cache(tmp_path, ttl_seconds=0.01)
+    cache.put("aa" * 32, {"x": 1})
+    time.sleep(0.02)
+
+    assert cache.get("aa" * 32) is None
+    assert not os.path.exists(cache._entry_path("aa" * 32))
+
+
+def test_size_eviction_drops_least_recently_read(tmp_path):
+    cache = _cache(tmp_path)
+    for key in ("aa", "bb", "cc"):
+        cache.put(key * 32, {"payload": "x" * 1000})
+    _age(cache, "aa" * 32, written_ago=300, read_ago=10)
+    _age(cache, "bb" * 32, written_ago=200, read_ago=200)
+    _age(cache, "cc" * 32, written_ago=100, read_ago=100)
+    cache.max_bytes = sum(os.path.getsize(cache._entry_path(k * 32)) for k in ("aa", "cc"))
+
+    cache.evict()
+    assert [os.path.exists(cache._entry_path(k * 32)) for k in ("aa", "bb", "cc")] == [
+        True,
+        False,
+        True,
+    ]
+
+
+def test_evict_reads_no_entry_contents(tmp_path, monkeypatch):
+    cache = _cache(tmp_path)
+    for i in range(20):
+        cache.put(f"{i:02d}" * 32, {"x": i})
+
+    def no_open(*args, **kwargs):
+        raise AssertionError("evict opened a cache entry")
+
+    monkeypatch.setattr(builtins, "open", no_open)
+    cache.evict()
+
+
+def test_entry_evicted_during_a_read_is_still_returned(tmp_path, monkeypatch):
+    cache = _cache(tmp_path)
+    cache.put("aa" * 32, {"x": 1})
+
+    def evicted(*args, **kwargs):
+        raise FileNotFoundError
+
+    monkeypatch.setattr(os, "utime", evicted)
+    assert cache.get("aa" * 32) == {"x": 1}
@@ -0,0 +1,64 @@
+import json
+
+from pypdf import PdfWriter
+
+from src.agents.doc_intelligence import DocumentIntelligenceAgent
+from src.core.fake_llm import FakeExtractionLLM
+
+
+def _catalog(path):
+    purchase_orders = [
+        {
+            "po_number": f"PO-{n}",
+            "supplier": f"Supplier {n}",
+            "date": "2024-01-01",
+            "currency": "GBP",
+            "line_items": [
+                {
+                    "description": f"Item {n}-{i}",
+                    "quantity": 1,
+                    "unit_price": 10.0,
+                    "line_total": 10.0,
+                }
+                for i in range(4)
+            ],
+        }
+        for n in range(7)
+    ]
+    path.write_text(json.dumps({"purchase_orders": purchase_orders}))
+
+
+def _blank_pdf(path, n_pages):
+    writer = PdfWriter()
+    for _ in range(n_pages):
+        writer.add_blank_page(width=200, height=200)
+    with open(path, "wb") as f:
+        writer.write(f)
+
+
+def test_page_chunks_are_answered_from_their_source_document(tmp_path):
+    _catalog(tmp_path / "pos.json")
+    pdf_path = str(tmp_path / "invoice.pdf")
+    _blank_pdf(pdf_path, 4)
+    llm = FakeExtractionLLM(
+        recordings_dir=None,
+        po_db_path=str(tmp_path / "pos.json"),
+        latency_ms=0,
+        rate_limit_rate=0,
+        error_rate=0,
+        requests_per_minute=0,
+    )
+    agent = DocumentIntelligenceAgent(llm=llm)
+
+    payloads = []
+    for pages, schema in (([0, 1], "InvoiceExtraction"), ([2, 3], "LineItemsExtraction")):
+        with agent._pdf_source(pdf_path, pages) as (source, _):
+            payloads.append(llm._payload_for(source.read(), "", schema))
+    with open(pdf_path, "rb") as f:
+        whole = llm._payload_for(f.read(), "", "InvoiceExtraction")
+
+    header, continuation = payloads
+    assert header["po_reference"] == whole["po_reference"]
+    assert header["supplier_name"] == whole["supplier_name"]
+    assert header["items"] + continuation["items"] == whole["items"]
+    assert len(header["items"]) == 2
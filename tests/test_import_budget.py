@@ -0,0 +1,8 @@
+import pytest
+
+from benchmarks import import_budget
+
+
+@pytest.mark.parametrize("check", sorted(import_budget.CHECKS))
+def test_cli_startup_does_not_load_the_ml_stack(check):
+    assert import_budget.probe(import_budget.CHECKS[check])["heavy"] == []
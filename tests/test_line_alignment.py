@@ -0,0 +1,35 @@
+from src.core.line_alignment import MATCH_THRESHOLD, align_line_items, similarity_matrix
+
+
+def test_pairs_at_the_threshold_are_not_matched():
+    # Indel similarity of these two is exactly 0.6.
+    assert similarity_matrix(["abcde"], ["abcxy"])[0, 0] == MATCH_THRESHOLD
+
+    alignment = align_line_items(["abcde"], ["abcxy"])
+    assert alignment.matches == {}
+    assert alignment.unmatched_invoice == [0]
+    assert alignment.unmatched_po == [0]
+
+    assert align_line_items(["abcde"], ["abcxy"], threshold=0.5).matches == {0: (0, 0.6000000238418579)}
+
+
+def test_reordered_lines_are_matched_one_to_one():
+    invoice = ["Magnesium Stearate", "PARACETAMOL BP 500MG", "Lactose"]
+    po = ["Paracetamol BP 500mg", "Lactose Monohydrate", "Magnesium Stearate Ph Eur"]
+
+    alignment = align_line_items(invoice, po)
+    assert {i: j for i, (j, _) in alignment.matches.items()} == {0: 2, 1: 0}
+    assert alignment.matches[1][1] == 1.0
+    assert alignment.unmatched_invoice == [2]
+    assert alignment.unmatched_po == [1]
+
+
+def test_each_po_line_is_claimed_once():
+    alignment = align_line_items(["Talc Pharma Grade", "Talc Pharma Grade"], ["Talc Pharma Grade"])
+    assert len(alignment.matches) == 1
+    assert len(alignment.unmatched_invoice) == 1
+
+
+def test_empty_sides():
+    assert align_line_items([], ["a"]).unmatched_po == [0]
+    assert align_line_items(["a"], []).unmatched_invoice == [0]
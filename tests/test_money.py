@@ -0,0 +1,62 @@
+from decimal import Decimal
+
+import numpy as np
+import pytest
+
+from src.core import money
+
+
+@pytest.mark.parametrize(
+    "currency, exponent",
+    [(None, 2), ("GBP", 2), ("usd", 2), (" JPY ", 0), ("KRW", 0), ("KWD", 3), ("CLF", 4), ("XYZ", 2)],
+)
+def test_minor_exponent(currency, exponent):
+    assert money.minor_exponent(currency) == exponent
+
+
+def test_quantize_rounds_the_written_value_half_up():
+    # 2.675 is stored as 2.67499999..., but it was written as 2.675.
+    assert money.quantize(2.675, "GBP") == Decimal("2.68")
+    assert money.quantize(-2.675, "GBP") == Decimal("-2.68")
+    assert money.quantize(1234.5, "JPY") == Decimal("1235")
+    assert money.to_minor_units(1.2345, "KWD") == 1235
+
+
+def test_line_total_error_is_exact_for_float_products():
+    # 3 * 0.1 == 0.30000000000000004 in float arithmetic.
+    assert money.line_total_error(3, 0.1, 0.3) == 0
+    assert money.line_total_error(100, 88.0, 8680.0) == 12000
+    assert money.line_total_error(3, 333, 999, "JPY") == 0
+    assert money.line_total_error(1, 0.0015, 0.002, "KWD") == 0
+
+
+def test_exceeds_ratio_at_the_boundary():
+    assert not money.exceeds_ratio(105.0, 100.0, 0.05)
+    assert money.exceeds_ratio(105.01, 100.0, 0.05)
+    assert not money.exceeds_ratio(0.0, 0.0, 0.05)
+    assert money.exceeds_ratio(5.0, 0.0, 0.05)
+
+
+def test_array_paths_match_the_scalar_ones():
+    rng = np.random.default_rng(0)
+    n = 2000
+    # Up to 4 and 7 places: past the fast path's 3 and 6, so the Decimal
+    # fallback is exercised too.
+    quantity = np.array([round(v, d) for v, d in zip(rng.uniform(0, 500, n), rng.integers(0, 5, n))])
+    unit_price = np.array([round(v, d) for v, d in zip(rng.uniform(0, 2000, n), rng.integers(0, 8, n))])
+    line_total = np.round(quantity * unit_price + rng.choice([0, 0.01, 0.5], n), 2)
+    currencies = rng.choice(["GBP", "JPY", "KWD"], n)
+    exponents = money.exponents_for(list(currencies))
+
+    errors = money.line_total_errors(quantity, unit_price, line_total, exponents)
+    expected = [
+        money.line_total_error(float(q), float(p), float(t), str(c))
+        for q, p, t, c in zip(quantity, unit_price, line_total, currencies)
+    ]
+    assert errors.tolist() == expected
+
+    po_prices = np.round(unit_price / rng.choice([1.0, 1.05, 1.2], n), 2)
+    flagged = money.exceeds_ratio_array(unit_price, po_prices, 0.05)
+    assert flagged.tolist() == [
+        money.exceeds_ratio(float(v), float(r), 0.05) for v, r in zip(unit_price, po_prices)
+    ]
@@ -0,0 +1,63 @@
+import os
+import threading
+import time
+
+from src.agents import doc_intelligence
+from src.agents.doc_intelligence import DocumentIntelligenceAgent
+from src.core.pdf_payload import PayloadBudget, base64_length, inline_footprint
+
+INVOICE = os.path.join(os.path.dirname(__file__), "..", "data", "invoices", "Invoice_1_Baseline.pdf")
+
+
+def test_footprint_covers_raw_bytes_and_two_encodings():
+    assert base64_length(3) == 4
+    assert base64_length(4) == 8
+    assert inline_footprint(300) == 300 + 2 * 400
+
+
+def test_budget_blocks_until_room_is_released():
+    budget = PayloadBudget(max_bytes=100)
+    order = []
+
+    def second():
+        with budget.reserve(60):
+            order.append("second")
+
+    with budget.reserve(60):
+        thread = threading.Thread(target=second)
+        thread.start()
+        time.sleep(0.05)
+        order.append("first done")
+    thread.join()
+
+    assert order == ["first done", "second"]
+    assert budget.waits == 1
+    assert budget.peak_bytes == 60
+    assert budget.in_flight == 0
+
+
+def test_oversized_request_is_admitted_when_nothing_else_is_in_flight():
+    budget = PayloadBudget(max_bytes=10)
+    with budget.reserve(50):
+        assert budget.in_flight == 50
+    assert budget.waits == 0
+
+
+def test_page_split_reserves_the_source_size_before_parsing(monkeypatch):
+    budget = PayloadBudget(max_bytes=10**9)
+    agent = DocumentIntelligenceAgent(llm=object(), payload_budget=budget)
+    seen = []
+    real_reader = doc_intelligence.PdfReader
+
+    def reader(stream):
+        seen.append((budget.in_flight, isinstance(stream, str)))
+        return real_reader(stream)
+
+    monkeypatch.setattr(doc_intelligence, "PdfReader", reader)
+    with agent._pdf_source(INVOICE, [0]) as (source, size):
+        assert size > 0
+        assert source.read(5) == b"%PDF-"
+        # Released once the chunk is written, before the payload is reserved.
+        assert budget.in_flight == 0
+
+    assert seen == [(os.path.getsize(INVOICE), False)]
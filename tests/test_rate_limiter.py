@@ -0,0 +1,55 @@
+import pytest
+
+from src.core.rate_limiter import RateLimiter, backoff_delay, is_rate_limit_error, parse_retry_after
+
+
+def test_requests_queue_in_arrival_order_at_the_configured_rate():
+    limiter = RateLimiter(requests_per_minute=60, tokens_per_minute=None)
+    waits = [limiter.reserve() for _ in range(3)]
+
+    assert waits[0] == pytest.approx(0.0, abs=0.01)
+    assert waits[1] == pytest.approx(1.0, abs=0.01)
+    assert waits[2] == pytest.approx(2.0, abs=0.01)
+
+
+def test_token_budget_delays_a_large_request():
+    limiter = RateLimiter(requests_per_minute=6000, tokens_per_minute=600)
+
+    assert limiter.reserve(tokens=600) == pytest.approx(0.0, abs=0.01)
+    assert limiter.reserve(tokens=300) == pytest.approx(30.0, abs=0.1)
+
+
+def test_penalize_pauses_and_halves_the_rate_down_to_the_floor():
+    limiter = RateLimiter(requests_per_minute=60, tokens_per_minute=None, min_rate_fraction=0.2)
+    limiter.penalize(5.0)
+
+    assert limiter.reserve() == pytest.approx(5.0, abs=0.05)
+    assert limiter._rate_scale == 0.5
+
+    for _ in range(5):
+        limiter.penalize(0.0)
+    assert limiter._rate_scale == 0.2
+    assert limiter.throttle_events == 6
+
+
+def test_successes_restore_the_rate_additively():
+    limiter = RateLimiter(requests_per_minute=60, tokens_per_minute=None)
+    limiter.penalize(0.0)
+
+    for _ in range(4):
+        limiter.record_success()
+    assert limiter._rate_scale == pytest.approx(0.7)
+
+    for _ in range(20):
+        limiter.record_success()
+    assert limiter._rate_scale == 1.0
+
+
+def test_quota_errors_and_retry_hints_are_recognised():
+    error = RuntimeError("429 RESOURCE_EXHAUSTED: quota exceeded. Please retry in 12.5s.")
+
+    assert is_rate_limit_error(error)
+    assert not is_rate_limit_error(RuntimeError("500 INTERNAL"))
+    assert parse_retry_after(error) == 12.5
+    assert 12.5 <= backoff_delay(0, retry_after=12.5, cap=60) <= 13.5
+    assert 2.0 <= backoff_delay(2, base=1.0, cap=60) <= 4.0
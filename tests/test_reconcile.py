@@ -0,0 +1,83 @@
+import json
+
+import pytest
+
+import main
+from benchmarks.pipeline_benchmark import HashingEmbeddings, StubExtractor
+from benchmarks.synthetic import NoiseProfile, generate_invoices, iter_purchase_orders, write_catalog
+from src.core.registry import ResourceRegistry
+from src.core.results_store import ResultsStore
+from src.core.state import AgentState
+
+
+@pytest.fixture
+def history(tmp_path, monkeypatch):
+    catalog = tmp_path / "po.json"
+    write_catalog(str(catalog), iter_purchase_orders(60, n_suppliers=20, seed=2))
+    with open(catalog) as f:
+        purchase_orders = json.load(f)["purchase_orders"]
+    payloads = {
+        f"invoice_{i}.pdf": payload
+        for i, (payload, _) in enumerate(
+            generate_invoices(purchase_orders, 40, NoiseProfile(price_trap=0.0), 4)
+        )
+    }
+
+    def store():
+        return ResultsStore(
+            path=str(tmp_path / "results.jsonl"),
+            export_path=str(tmp_path / "results.json"),
+            index_path=str(tmp_path / "results.sqlite"),
+        )
+
+    def registry():
+        resources = ResourceRegistry(po_db_path=str(catalog), vector_db_path=str(tmp_path / "index"))
+        resources.get_or_create("embeddings", HashingEmbeddings)
+        return resources
+
+    monkeypatch.setattr(main, "ResultsStore", store)
+    monkeypatch.setattr(main, "ResourceRegistry", registry)
+
+    # Stored extractions that were never matched, as after an early crash.
+    extractor = StubExtractor(payloads)
+    store().append_many(
+        [main.build_output(name, dict(extractor.process(AgentState(file_path=name)))) for name in payloads]
+    )
+    return catalog, store
+
+
+def _log_lines(store):
+    with open(store().path) as f:
+        return sum(1 for _ in f)
+
+
+def test_reconcile_appends_only_changed_outcomes(history):
+    catalog, store = history
+
+    main.reconcile_results(batch_size=16)
+    assert _log_lines(store) == 80
+    records = store().load()
+    assert all(r["processing_results"]["matching_results"]["matched_po"] for r in records)
+    assert all(r["processing_results"]["llm_usage"]["calls"] == 0 for r in records)
+
+    main.reconcile_results(batch_size=16)
+    assert _log_lines(store) == 80
+
+    # A PO price cut only re-reports the invoices billed against it.
+    with open(catalog) as f:
+        data = json.load(f)
+    repriced = records[0]["processing_results"]["matching_results"]["matched_po"]
+    po = next(p for p in data["purchase_orders"] if p["po_number"] == repriced)
+    po["line_items"][0]["unit_price"] = round(po["line_items"][0]["unit_price"] / 2, 2)
+    with open(catalog, "w") as f:
+        json.dump(data, f)
+
+    main.reconcile_results(batch_size=16)
+    affected = [
+        r for r in records if r["processing_results"]["matching_results"]["matched_po"] == repriced
+    ]
+    assert _log_lines(store) == 80 + len(affected)
+    latest = {r["source_file"]: r for r in store().load()}
+    for record in affected:
+        types = [d["type"] for d in latest[record["source_file"]]["processing_results"]["discrepancies"]]
+        assert "price_mismatch" in types
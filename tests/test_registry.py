@@ -0,0 +1,40 @@
+import threading
+import time
+
+from src.core.registry import ResourceRegistry
+
+
+def test_concurrent_callers_share_a_single_load():
+    registry = ResourceRegistry()
+    workers = 8
+    barrier = threading.Barrier(workers)
+    results = []
+
+    def factory():
+        time.sleep(0.05)
+        return object()
+
+    def worker():
+        barrier.wait()
+        results.append(registry.get_or_create("model", factory))
+
+    threads = [threading.Thread(target=worker) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len({id(resource) for resource in results}) == 1
+    assert registry.stats()["model"]["loads"] == 1
+    assert registry.stats()["model"]["hits"] == workers - 1
+
+
+def test_keys_are_counted_separately():
+    registry = ResourceRegistry()
+    registry.get_or_create("a", object)
+    registry.get_or_create("a", object)
+    registry.get_or_create("b", object)
+
+    stats = registry.stats()
+    assert (stats["a"]["loads"], stats["a"]["hits"]) == (1, 1)
+    assert (stats["b"]["loads"], stats["b"]["hits"]) == (1, 0)
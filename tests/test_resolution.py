@@ -0,0 +1,47 @@
+from src.agents.resolution import ResolutionAgent
+from src.core.state import AgentState, Discrepancy, POMatchCandidate
+
+
+def _inferred_state(method):
+    return AgentState(
+        file_path="invoice.pdf",
+        extraction_confidence=0.97,
+        math_verification_passed=True,
+        matched_po_id="PO-1",
+        match_candidates=[
+            POMatchCandidate(po_number="PO-1", confidence=0.85, method=method, reasoning="")
+        ],
+        discrepancies=[
+            Discrepancy(
+                type="missing_po",
+                severity="medium",
+                field="po_reference",
+                details="Document lacks explicit reference to PO-1.",
+                invoice_value=None,
+                po_value="PO-1",
+                confidence=0.85,
+            )
+        ],
+    )
+
+
+def test_po_inferred_from_the_supplier_partition_escalates():
+    state = ResolutionAgent().resolve(_inferred_state("supplier_partition"))
+    assert state.final_action == "escalate_to_human"
+
+
+def test_po_inferred_by_semantic_search_is_flagged():
+    state = ResolutionAgent().resolve(_inferred_state("fuzzy_hybrid"))
+    assert state.final_action == "flag_for_review"
+    assert "PO inferred (PO-1)" in state.final_report_reasoning
+
+
+def test_clean_referenced_match_is_approved():
+    state = AgentState(
+        file_path="invoice.pdf",
+        extraction_confidence=0.97,
+        math_verification_passed=True,
+        extracted_po_ref="PO-1",
+        matched_po_id="PO-1",
+    )
+    assert ResolutionAgent().resolve(state).final_action == "auto_approve"
@@ -0,0 +1,111 @@
+from src.core.results_index import ResultsIndex, iso_date
+from src.core.results_store import ResultsStore
+
+
+def _record(name, action="auto_approve", supplier="Acme Ltd", date="15/01/2024", confidence=0.9):
+    return {
+        "source_file": name,
+        "invoice_id": name.split(".")[0].upper(),
+        "processing_results": {
+            "recommended_action": action,
+            "extraction_confidence": confidence,
+            "extracted_data": {"supplier": supplier, "date": date, "line_items": [{}]},
+            "matching_results": {"matched_po": "PO-1"},
+            "discrepancies": [],
+        },
+    }
+
+
+def _store(tmp_path):
+    return ResultsStore(
+        path=str(tmp_path / "results.jsonl"),
+        export_path=str(tmp_path / "results.json"),
+        index_path=str(tmp_path / "results.sqlite"),
+    )
+
+
+def test_pages_are_filtered_and_ordered_by_log_position(tmp_path):
+    store = _store(tmp_path)
+    store.append_many(
+        [
+            _record(f"invoice_{i}.pdf", action="escalate_to_human" if i % 3 == 0 else "auto_approve")
+            for i in range(10)
+        ]
+    )
+
+    rows, total = store.index.query(offset=1, limit=2, actions=["escalate_to_human"])
+    assert total == 4
+    assert [row["source_file"] for row in rows] == ["invoice_3.pdf", "invoice_6.pdf"]
+    assert rows[0]["invoice_date"] == "2024-01-15"
+
+    rows, total = store.index.query(search="INVOICE_7")
+    assert total == 1 and "record" not in rows[0]
+    assert store.index.get("invoice_7.pdf")["invoice_id"] == "INVOICE_7"
+
+
+def test_rewritten_file_replaces_its_row(tmp_path):
+    store = _store(tmp_path)
+    store.append(_record("a.pdf", action="flag_for_review"))
+    store.append(_record("a.pdf", action="auto_approve", supplier="Other Co"))
+
+    rows, total = store.index.query()
+    assert total == 1
+    assert (rows[0]["action"], rows[0]["supplier"]) == ("auto_approve", "Other Co")
+    assert store.index.suppliers() == ["Other Co"]
+
+
+def test_index_out_of_step_with_the_log_is_rebuilt(tmp_path):
+    store = _store(tmp_path)
+    store.append(_record("a.pdf"))
+    # Written by a process that did not maintain the index.
+    ResultsStore(
+        path=store.path, export_path=store.export_path, index_path=None
+    ).append(_record("b.pdf"))
+
+    reopened = _store(tmp_path)
+    assert reopened.index.count() == 2
+    assert ResultsIndex(str(tmp_path / "results.sqlite")).log_size() == reopened._log_size()
+
+
+def test_dates_are_normalised_for_range_filters():
+    assert iso_date("15/01/2024") == "2024-01-15"
+    assert iso_date("January 15, 2024") == "2024-01-15"
+    assert iso_date("next Tuesday") is None
+
+
+def _traced(name, action, supplier, wall_ms, discrepancy_types=()):
+    record = _record(name, action=action, supplier=supplier)
+    record["processed_at"] = "2024-02-01T10:00:00"
+    record["processing_results"]["discrepancies"] = [{"type": t} for t in discrepancy_types]
+    record["processing_results"]["agent_execution_trace"] = [
+        {"agent": "Matching Agent", "metrics": {"wall_ms": wall_ms}}
+    ]
+    return record
+
+
+def _all_aggregates(index):
+    metrics = ("action", "supplier", "discrepancy_type", "day", "latency:Matching Agent")
+    return {metric: index.aggregates(metric) for metric in metrics}
+
+
+def test_aggregates_follow_appends_and_replacements(tmp_path):
+    store = _store(tmp_path)
+    store.append_many(
+        [
+            _traced("a.pdf", "flag_for_review", "Acme Ltd", 40, ["price_mismatch"]),
+            _traced("b.pdf", "auto_approve", "Acme Ltd", 300),
+        ]
+    )
+    store.append(_traced("a.pdf", "auto_approve", "Other Co", 8))
+
+    index = store.index
+    assert index.aggregates("action") == {"auto_approve": (2, 0.0)}
+    assert index.aggregates("supplier") == {"Acme Ltd": (1, 0.0), "Other Co": (1, 0.0)}
+    assert index.aggregates("discrepancy_type") == {}
+    assert index.aggregates("day") == {"2024-02-01": (2, 1.8)}
+    assert index.latency_histograms() == {"Matching Agent": {"10": (1, 8.0), "500": (1, 300.0)}}
+
+    # The incremental deltas agree with a rebuild from the log.
+    incremental = _all_aggregates(index)
+    store.reindex()
+    assert _all_aggregates(index) == incremental
@@ -0,0 +1,46 @@
+import json
+
+import pytest
+
+from src.core.results_store import ResultsStore
+
+
+def _store(tmp_path):
+    return ResultsStore(
+        path=str(tmp_path / "results.jsonl"),
+        export_path=str(tmp_path / "results.json"),
+        index_path=None,
+    )
+
+
+def test_torn_tail_line_is_dropped_and_log_stays_appendable(tmp_path):
+    store = _store(tmp_path)
+    store.append({"source_file": "a.pdf", "invoice_id": "A"})
+    store.append({"source_file": "b.pdf", "invoice_id": "B"})
+    with open(store.path, "a") as f:
+        f.write('{"source_file": "c.pdf", "invoi')
+
+    store = _store(tmp_path)
+    assert [r["source_file"] for r in store.load()] == ["a.pdf", "b.pdf"]
+    with open(store.path) as f:
+        assert f.read().endswith("\n")
+
+    store.append({"source_file": "c.pdf", "invoice_id": "C"})
+    assert [r["source_file"] for r in store.load()] == ["a.pdf", "b.pdf", "c.pdf"]
+
+
+def test_latest_record_per_file_wins(tmp_path):
+    store = _store(tmp_path)
+    store.append({"source_file": "a.pdf", "invoice_id": "old"})
+    store.append({"source_file": "a.pdf", "invoice_id": "new"})
+
+    assert [r["invoice_id"] for r in store.load()] == ["new"]
+
+
+def test_corrupt_line_before_the_tail_raises(tmp_path):
+    store = _store(tmp_path)
+    with open(store.path, "w") as f:
+        f.write("not json\n" + json.dumps({"source_file": "a.pdf"}) + "\n")
+
+    with pytest.raises(RuntimeError, match="Corrupt record"):
+        store.load()
@@ -0,0 +1,89 @@
+from src.core.supplier_index import SupplierIndex, normalize_supplier
+
+
+def _index():
+    return SupplierIndex(
+        {
+            "PO-1": {"supplier": "Global Pharma Supply Co.", "supplier_aliases": ["GPS Ltd"]},
+            "PO-2": {"supplier": "Global Pharma Supply Co.", "status": "closed"},
+            "PO-3": {"supplier": "Global Pharma Supply Co."},
+            "PO-4": {"supplier": "Acme Lab Supplies Ltd"},
+        }
+    )
+
+
+def test_legal_suffixes_and_punctuation_are_normalised_away():
+    assert normalize_supplier("Global Pharma Supply Co.") == "global pharma supply"
+    assert normalize_supplier("Smith & Sons LLC") == "smith and sons"
+    assert normalize_supplier("The Co.") == "the co"
+
+
+def test_exact_alias_and_fuzzy_names_resolve_to_the_canonical_supplier():
+    index = _index()
+
+    assert index.resolve("GLOBAL PHARMA SUPPLY LIMITED") == [("global pharma supply", 1.0)]
+    assert index.resolve("GPS") == [("global pharma supply", 1.0)]
+    (canonical, score), = index.resolve("Global Pharma Suppy")
+    assert canonical == "global pharma supply" and 0.6 <= score < 1.0
+    assert index.resolve("Unrelated Widgets") == []
+    assert index.display_names["global pharma supply"] == "Global Pharma Supply Co."
+
+
+def test_partitions_hold_only_open_purchase_orders():
+    index = _index()
+
+    assert index.purchase_orders_for("global pharma supply") == ["PO-1", "PO-3"]
+    assert index.purchase_orders_for("acme lab supplies") == ["PO-4"]
+    assert index.purchase_orders_for("nobody") == []
+
+
+class _Catalog:
+    def __init__(self, purchase_orders):
+        self.data = purchase_orders
+        self.supplier_index = SupplierIndex(purchase_orders)
+
+    def get_exact_match(self, po_number):
+        return self.data.get(po_number)
+
+
+def _po(supplier, descriptions, status="open"):
+    return {
+        "supplier": supplier,
+        "status": status,
+        "line_items": [{"description": d} for d in descriptions],
+    }
+
+
+def test_matching_picks_the_po_in_the_supplier_partition_whose_lines_align():
+    from src.agents.matching import MatchingAgent
+    from src.core.state import AgentState, ExtractedLineItem
+
+    catalog = _Catalog(
+        {
+            "PO-1": _po("Global Pharma Supply Co.", ["Nitrile gloves, box of 100"]),
+            "PO-2": _po("Global Pharma Supply Co.", ["Microcrystalline cellulose 25kg"]),
+            "PO-3": _po("Global Pharma Supply Co.", ["Microcrystalline cellulose 25kg"], "closed"),
+            "PO-4": _po("Acme Lab Supplies Ltd", ["Microcrystalline cellulose 25kg"]),
+        }
+    )
+    state = AgentState(
+        file_path="invoice.pdf",
+        extracted_supplier="GLOBAL PHARMA SUPPLY LTD",
+        extracted_items=[
+            ExtractedLineItem(
+                description="Microcrystalline Cellulose 25 kg",
+                quantity=1,
+                unit_price=10.0,
+                line_total=10.0,
+                confidence=0.9,
+            )
+        ],
+    )
+
+    assert MatchingAgent(db=catalog)._match_supplier_partition(state)
+    assert state.matched_po_id == "PO-2"
+    assert [c.po_number for c in state.match_candidates] == ["PO-2"]
+    assert state.match_candidates[0].method == "supplier_partition"
+
+    state.extracted_supplier = "Unknown Trading"
+    assert not MatchingAgent(db=catalog)._match_supplier_partition(state)
@@ -0,0 +1,82 @@
+import json
+import os
+
+from src.agents.text_layer import (
+    TEXT_LAYER_CONFIDENCE,
+    UNCONFIRMED_HEADER_CONFIDENCE,
+    TextLayerExtractor,
+)
+from src.core.supplier_index import SupplierIndex
+
+DATA = os.path.join(os.path.dirname(__file__), "..", "data")
+INVOICES = os.path.join(DATA, "invoices")
+
+
+class Catalog:
+    """The parts of PurchaseOrderDatabase the extractor checks headers against."""
+
+    def __init__(self, drop=()):
+        with open(os.path.join(DATA, "purchase_orders.json")) as f:
+            pos = json.load(f)["purchase_orders"]
+        self.data = {po["po_number"]: po for po in pos if po["po_number"] not in drop}
+        self.supplier_index = SupplierIndex(self.data)
+
+    def get_exact_match(self, po_number):
+        return self.data.get(po_number)
+
+
+def _extract(name, db=None):
+    return TextLayerExtractor(db=db or Catalog()).extract(os.path.join(INVOICES, name))
+
+
+def test_digital_invoice_is_extracted_locally():
+    result = _extract("Invoice_1_Baseline.pdf")
+
+    assert result["invoice_id"] == "INV-2024-1001"
+    assert result["supplier_name"] == "PharmaChem Supplies Ltd"
+    assert result["po_reference"] == "PO-2024-001"
+    assert result["currency"] == "GBP"
+    assert result["overall_confidence"] == TEXT_LAYER_CONFIDENCE
+    assert result["items"][0] == {
+        "description": "Paracetamol BP 500mg",
+        "quantity": 50.0,
+        "unit_price": 125.0,
+        "line_total": 6250.0,
+        "confidence": 1.0,
+    }
+
+
+def test_other_layouts_and_missing_po_reference():
+    different_format = _extract("Invoice_3_Different_Format.pdf")
+    assert different_format["invoice_id"] == "MC-INV-3421"
+    assert different_format["po_reference"] == "PO-2024-003"
+    assert different_format["items"][0]["description"] == "Pregelatinized Starch"
+
+    missing_po = _extract("Invoice_5_Missing_PO.pdf")
+    assert missing_po["po_reference"] is None
+    assert len(missing_po["items"]) == 4
+
+
+def test_headers_not_in_the_catalog_escalate_to_the_llm():
+    assert _extract("Invoice_1_Baseline.pdf", Catalog(drop={"PO-2024-001"})) is None
+
+    catalog = Catalog()
+    catalog.supplier_index = SupplierIndex(
+        {k: v for k, v in catalog.data.items() if v["supplier"] != "PharmaChem Supplies Ltd"}
+    )
+    assert _extract("Invoice_1_Baseline.pdf", catalog) is None
+
+
+def test_without_a_catalog_confidence_stays_below_auto_approve():
+    result = TextLayerExtractor().extract(os.path.join(INVOICES, "Invoice_1_Baseline.pdf"))
+    assert result["overall_confidence"] == UNCONFIRMED_HEADER_CONFIDENCE < 0.80
+
+
+def test_scanned_invoice_escalates_to_the_llm():
+    assert _extract("Invoice_2_Scanned.pdf") is None
+
+
+def test_unreadable_file_escalates(tmp_path):
+    path = tmp_path / "broken.pdf"
+    path.write_bytes(b"not a pdf")
+    assert TextLayerExtractor().extract(str(path)) is None